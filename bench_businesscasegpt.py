@@ -0,0 +1,273 @@
+# ============================================================
+#  Kisbye Consulting – BusinessCaseGPT – mikro-benchmarks
+#
+#  Måler tid og peak-hukommelse pr. funktion på syntetiske cases
+#  i flere størrelser og sammenligner med en gemt baseline.
+#
+#  Kør:
+#    python bench_businesscasegpt.py --save-baseline   (før en ændring)
+#    python bench_businesscasegpt.py                   (efter – fejler ved regression)
+#
+#  Alt kører offline og i hukommelsen – intet skrives i output/.
+# ============================================================
+
+import os
+import sys
+import io
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+import businesscasegpt_v9_0_web as bc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "bench_baseline.json")
+
+# størrelse -> (tegn i AS-IS/TO-BE-teksterne, kB extra_json)
+SIZES = {
+    "small": (200, 1),
+    "medium": (5_000, 50),
+    "large": (100_000, 1_000),
+}
+
+WORDS = (
+    "medarbejder modtager mail fra teamleder og opretter sagen i systemet "
+    "data kopieres manuelt fra excel til sharepoint og kontrolleres "
+    "ved fejl sendes sagen retur med en kommentar til sagsbehandleren"
+).split()
+
+
+# ============================================================
+# SYNTETISKE DATA
+# ============================================================
+def _text(rng: random.Random, chars: int) -> str:
+    """læsbar fyldtekst med linjeskift – så Word-afsnit og tabeller får realistisk indhold"""
+    out, n = [], 0
+    while n < chars:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        out.append(line)
+        n += len(line) + 1
+    return "\n".join(out)[:chars]
+
+
+def _extra_json(rng: random.Random, kb: int) -> str:
+    """process-mining-lignende eksport på ca. kb kilobyte"""
+    events, size = [], 0
+    while size < kb * 1024:
+        ev = {"case": rng.randint(1, 10_000), "activity": rng.choice(WORDS), "minutes": round(rng.uniform(1, 60), 1)}
+        events.append(ev)
+        size += 70
+    return json.dumps({"process_overview": {"process_name": "Syntetisk"}, "events": events}, indent=2)
+
+
+def synthetic_case(size: str, seed: int = 1) -> dict:
+    chars, kb = SIZES[size]
+    rng = random.Random(seed)
+    c = bc.empty_form()
+    c.update({
+        "procesnavn": f"Benchmark {size}",
+        "formaal": _text(rng, min(chars, 500)),
+        "proces_ejer": "Procesejer",
+        "as_is_beskrivelse": _text(rng, chars),
+        "to_be_beskrivelse": _text(rng, chars),
+        "varighed_min_min": "20",
+        "varighed_min_max": "60",
+        "extra_json": _extra_json(rng, kb),
+    })
+    return bc.normalize_form(c)
+
+
+def filled_questionnaire(c: dict) -> bytes:
+    """spørgeskemaet som en bruger har udfyldt det ('Label: værdi'-afsnit)"""
+    from docx import Document
+    doc = Document()
+    doc.add_heading("Business Case – spørgeskema", level=1)
+    for title, key in bc.QUESTIONNAIRE_FIELDS:
+        p = doc.add_paragraph()
+        p.add_run(f"{title}: ").bold = True
+        p.add_run(str(c.get(key, "")))
+    bio = io.BytesIO()
+    doc.save(bio)
+    return bio.getvalue()
+
+
+# ============================================================
+# BENCHMARKS
+# ============================================================
+def benchmarks(c: dict) -> dict:
+    """navn -> funktion uden argumenter (alt forberedt på forhånd, så kun selve kaldet måles)"""
+    m = bc.calc_metrics(c)
+    sim = bc.simulate_metrics(c)
+    questionnaire = filled_questionnaire(c)
+
+    def to_buffer(fn, *args, **kwargs):
+        return lambda: fn(io.BytesIO(), *args, **kwargs)
+
+    return {
+        "calc_metrics": lambda: bc.calc_metrics(c),
+        "simulate_metrics": lambda: bc.simulate_metrics(c),
+        "build_excel": to_buffer(bc.build_excel, c, m, sim=sim),
+        "build_word_pdd[docx]": to_buffer(bc.build_word_pdd, c, m, backend="docx"),
+        "build_word_pdd[ooxml]": to_buffer(bc.build_word_pdd, c, m, backend="ooxml"),
+        "build_word_leadership[docx]": to_buffer(
+            bc.build_word_leadership, c, m, extra_json_text=c["extra_json"], sim=sim, backend="docx"),
+        "build_word_leadership[ooxml]": to_buffer(
+            bc.build_word_leadership, c, m, extra_json_text=c["extra_json"], sim=sim, backend="ooxml"),
+        "build_word_questionnaire": bc.build_word_questionnaire,
+        "parse_docx_to_form": lambda: bc.parse_docx_to_form(io.BytesIO(questionnaire)),
+    }
+
+
+def measure_time(fn, repeat: int, min_sample_s: float) -> float:
+    """median af 'repeat' målinger; hver måling kører fn nok gange til at vare min_sample_s"""
+    fn()  # opvarmning (imports, caches)
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_sample_s or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_sample_s / 10 else 2
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - t0) / loops)
+    return statistics.median(samples)
+
+
+def measure_peak(fn) -> int:
+    """peak-allokering (bytes) under ét kald, målt med tracemalloc"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, only=None, repeat: int = 5, min_sample_s: float = 0.05) -> dict:
+    results = {}
+    for size in sizes:
+        c = synthetic_case(size)
+        for name, fn in benchmarks(c).items():
+            if only and not any(o in name for o in only):
+                continue
+            key = f"{name} [{size}]"
+            results[key] = {
+                "median_s": measure_time(fn, repeat, min_sample_s),
+                "peak_bytes": measure_peak(fn),
+            }
+            print(f"  {key:<42} {fmt_time(results[key]['median_s']):>10}  {fmt_bytes(results[key]['peak_bytes']):>9}",
+                  flush=True)
+    return results
+
+
+# ============================================================
+# SAMMENLIGNING MED BASELINE
+# ============================================================
+def fmt_time(s: float) -> str:
+    if s < 1e-3:
+        return f"{s * 1e6:.1f} µs"
+    if s < 1:
+        return f"{s * 1e3:.2f} ms"
+    return f"{s:.2f} s"
+
+
+def fmt_bytes(b: int) -> str:
+    return f"{b / 1024:.0f} kB" if b < 1024 * 1024 else f"{b / 1024 / 1024:.1f} MB"
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_bytes: int = 64 * 1024) -> list:
+    """
+    Rækker over alle fælles benchmarks. En regression er tid (eller peak-hukommelse)
+    mere end 'threshold' over baseline; små hukommelsesforskelle (< min_bytes) ignoreres.
+    """
+    rows = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        t_ratio = cur["median_s"] / base["median_s"] if base["median_s"] else 1.0
+        m_ratio = cur["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] else 1.0
+        slower = t_ratio > 1 + threshold
+        fatter = m_ratio > 1 + threshold and cur["peak_bytes"] - base["peak_bytes"] > min_bytes
+        rows.append((key, t_ratio, m_ratio, slower or fatter))
+    return rows
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_baseline(path: str, results: dict, sizes):
+    data = {
+        "created": time.strftime("%Y-%m-%d %H:%M"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "app_version": bc.APP_VERSION,
+        "sizes": list(sizes),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Mikro-benchmarks for BusinessCaseGPT")
+    ap.add_argument("--sizes", default=",".join(SIZES), help="kommasepareret: " + ", ".join(SIZES))
+    ap.add_argument("--only", default="", help="kun benchmarks hvis navn indeholder en af disse (kommasepareret)")
+    ap.add_argument("--repeat", type=int, default=5, help="antal målinger pr. benchmark (median bruges)")
+    ap.add_argument("--min-time", type=float, default=0.05, help="min. sekunder pr. måling")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline-fil (JSON)")
+    ap.add_argument("--save-baseline", action="store_true", help="gem resultatet som ny baseline")
+    ap.add_argument("--threshold", type=float, default=0.25, help="tilladt forværring, fx 0.25 = 25%%")
+    ap.add_argument("--json", default="", help="skriv også resultatet til denne fil")
+    args = ap.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        ap.error(f"ukendt størrelse: {', '.join(unknown)}")
+    only = [o for o in args.only.split(",") if o]
+
+    print(f"BusinessCaseGPT v{bc.APP_VERSION} – Python {platform.python_version()} – {', '.join(sizes)}")
+    results = run(sizes, only=only, repeat=args.repeat, min_sample_s=args.min_time)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, sizes)
+        print(f"\nBaseline gemt: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nIngen baseline ({args.baseline}) – kør med --save-baseline først.")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    rows = compare(results, baseline.get("results", {}), args.threshold)
+    print(f"\nSammenlignet med baseline fra {baseline.get('created', '?')} (grænse +{args.threshold:.0%}):")
+    for key, t_ratio, m_ratio, bad in rows:
+        flag = "  <-- REGRESSION" if bad else ""
+        print(f"  {key:<42} tid {t_ratio - 1:+7.1%}   hukommelse {m_ratio - 1:+7.1%}{flag}")
+    regressions = [r for r in rows if r[3]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(er).")
+        return 1
+    print("\nIngen regressioner.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
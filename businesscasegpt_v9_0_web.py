@@ -6,25 +6,46 @@
 import os
 import sys
 import io
+import copy
 import json
+import hashlib
 import time
+import re
+import bisect
+import gc
+import tracemalloc
+import zipfile
 import shutil
+import uuid
+import unicodedata
+import signal
+import sqlite3
 import threading
 import webbrowser
+import multiprocessing
+from functools import lru_cache
+from urllib.parse import quote
+from contextlib import contextmanager, ExitStack
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from xml.sax.saxutils import escape as xml_escape
+
+_STARTED = time.perf_counter()  # nulpunkt for opstarts-tidslinjen (se mark_startup)
 
 from flask import (
-    Flask, request, render_template_string, send_from_directory,
-    Response, jsonify, url_for
+    Flask, request, render_template, send_from_directory,
+    Response, jsonify, url_for, g
 )
+from werkzeug.http import dump_options_header
 
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.utils import get_column_letter
+# openpyxl, python-docx, lxml og numpy importeres først i de funktioner der bruger dem
+# (og varmes op i baggrunden når serveren lytter) – så formularen er oppe hurtigst muligt
 
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+try:
+    import ijson  # valgfri – inkrementel læsning af store JSON-importer
+except ImportError:
+    ijson = None
 
 # ============================================================
 # AFSNIT 0 – STIER (virker i .py og i PyInstaller .exe)
@@ -38,21 +59,395 @@ else:
     RUN_DIR = BASE_DIR
 
 script_dir = RUN_DIR
-OUTPUT_DIR = os.path.join(RUN_DIR, "output")
+# BC_OUTPUT_DIR flytter output-mappen (fx belastningstesten, som ikke må fylde den rigtige)
+OUTPUT_DIR = os.environ.get("BC_OUTPUT_DIR") or os.path.join(RUN_DIR, "output")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-APP_TITLE = "Kisbye Consulting – BusinessCaseGPT v9.1"
+APP_VERSION = "9.1"
+APP_TITLE = f"Kisbye Consulting – BusinessCaseGPT v{APP_VERSION}"
 LOGO_PNG_SOURCE = "kisbye_logo.png"
 LOGO_ICO_SOURCE = "kisbye_logo.ico"
 
-app = Flask(__name__, static_folder="static")
+# antal worker-processer til batch-generering (default = antal kerner)
+BATCH_WORKERS = int(os.environ.get("BC_BATCH_WORKERS") or os.cpu_count() or 1)
+
+# baggrundsjobs for /generate (JOB_WORKERS afhænger af servertilstanden og står nedenfor)
+JOB_MAX_PENDING = int(os.environ.get("BC_JOB_MAX_PENDING") or 50)
+JOB_TTL_SECONDS = int(os.environ.get("BC_JOB_TTL") or 3600)
+# færdige jobs bygget i hukommelsen holder deres filer til ZIP-download – højst så mange MB i alt,
+# derefter slippes de ældste jobs' buffere (deres ZIP-link forsvinder, filerne kan bygges igen)
+JOB_MAX_BUFFER_MB = int(os.environ.get("BC_JOB_MAX_BUFFER_MB") or 256)
+
+# /ingest: grænser for udpakkede ZIP-filer (en zip-bombe fylder lidt på vejen ind, men meget udpakket),
+# og hvor mange filer der læses ind ad gangen
+INGEST_MAX_MEMBERS = int(os.environ.get("BC_INGEST_MAX_MEMBERS") or 2000)
+INGEST_MAX_MEMBER_MB = int(os.environ.get("BC_INGEST_MAX_MEMBER_MB") or 32)
+INGEST_MAX_TOTAL_MB = int(os.environ.get("BC_INGEST_MAX_TOTAL_MB") or 512)
+INGEST_MAX_RATIO = int(os.environ.get("BC_INGEST_MAX_RATIO") or 100)
+INGEST_CHUNK = int(os.environ.get("BC_INGEST_CHUNK") or 32)
+
+# servertilstand: BC_SERVER=production kører under waitress (flertrådet WSGI) til delt brug på en server
+# – ingen browser, ingen idle-killer, og jobs bygges i worker-processer
+SERVER_MODE = os.environ.get("BC_SERVER") or "local"
+SERVER_HOST = os.environ.get("BC_HOST") or "127.0.0.1"
+SERVER_PORT = int(os.environ.get("BC_PORT") or 5000)
+SERVER_THREADS = int(os.environ.get("BC_THREADS") or 8)
+JOB_PROCESSES = (os.environ.get("BC_JOB_PROCESSES") or ("1" if SERVER_MODE == "production" else "0")) == "1"
+# samtidige /generate-jobs: i servertilstand ét pr. waitress-tråd, så ingen bruger venter på en andens job,
+# lokalt ét pr. kerne
+JOB_WORKERS = int(
+    os.environ.get("BC_JOB_WORKERS")
+    or (SERVER_THREADS if SERVER_MODE == "production" else os.cpu_count() or 2)
+)
+
+# de tre artefakter i én case: "off" (efter hinanden), "thread" eller "process" (batch-puljen)
+ARTIFACT_PARALLEL = os.environ.get("BC_ARTIFACT_PARALLEL") or "off"
+
+# målinger: tid pr. fase som Server-Timing-header og histogrammer på /metrics (BC_METRICS=0 slår fra)
+METRICS_ENABLED = (os.environ.get("BC_METRICS") or "1") == "1"
+
+# hukommelsesprofilering (opt-in, koster tid): tracemalloc-snapshots omkring hver generering og tunge upload,
+# top-N allokeringsforskelle og advarsel når et vindue beholder mere end grænsen (se /diagnostics/memory)
+MEMPROFILE_ENABLED = (os.environ.get("BC_MEMPROFILE") or "0") == "1"
+MEMPROFILE_TOP = int(os.environ.get("BC_MEMPROFILE_TOP") or 10)
+MEMPROFILE_THRESHOLD_MB = float(os.environ.get("BC_MEMPROFILE_THRESHOLD_MB") or 5)
+MEMPROFILE_KEEP = int(os.environ.get("BC_MEMPROFILE_KEEP") or 50)
+
+# livscyklus: luk efter så mange sekunder uden aktivitet (0 = aldrig), og vent højst
+# så længe på igangværende requests/jobs før programmet lukker
+IDLE_TIMEOUT_SECONDS = int(os.environ.get("BC_IDLE_TIMEOUT") or 180)
+DRAIN_TIMEOUT_SECONDS = int(os.environ.get("BC_DRAIN_TIMEOUT") or 120)
+
+# JSON-import: max størrelse på uploads, og hvor rå payloads gemmes
+MAX_UPLOAD_MB = int(os.environ.get("BC_MAX_UPLOAD_MB") or 64)
+IMPORT_DIR = os.path.join(OUTPUT_DIR, "imports")
 
-last_ping = time.time()  # til idle-killer
+# indeks over alle genererede cases (SQLite) – /cases søger i det uden at kigge i output-mappen.
+# Ligger uden for output/, så det ikke kan hentes via /output/<fil>. BC_CASE_DB= (tom) slår det fra.
+CASE_DB = os.environ.get("BC_CASE_DB", os.path.join(RUN_DIR, "businesscase_cases.sqlite3"))
+CASES_PAGE_SIZE = 50
+
+# cache af færdige artefakter for identiske formularer
+CACHE_MAX_ENTRIES = int(os.environ.get("BC_CACHE_MAX_ENTRIES") or 256)
+CACHE_MAX_MB = int(os.environ.get("BC_CACHE_MAX_MB") or 256)
+CACHE_MAX_AGE_SECONDS = int(os.environ.get("BC_CACHE_MAX_AGE") or 24 * 3600)
+
+app = Flask(__name__, static_folder="static")
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
 
 
 # ============================================================
 # AFSNIT 1 – HJÆLPERE
 # ============================================================
+# opstarts-tidslinje: fase -> sekunder siden modulet begyndte at loade (vises på /startup)
+STARTUP_TIMELINE = OrderedDict()
+
+
+def mark_startup(phase: str):
+    if phase not in STARTUP_TIMELINE:
+        STARTUP_TIMELINE[phase] = round(time.perf_counter() - _STARTED, 4)
+
+
+class ActivityTracker:
+    """
+    Sidste aktivitet + antal igangværende requests og jobs.
+    idle-killer og nedlukning venter på den (Condition) i stedet for at polle,
+    så der aldrig lukkes midt i en generering eller et download.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._last = time.monotonic()
+        self._busy = 0
+        self.stopping = False
+
+    def touch(self):
+        with self._cond:
+            self._last = time.monotonic()
+            self._cond.notify_all()
+
+    def begin(self):
+        with self._cond:
+            self._busy += 1
+            self._last = time.monotonic()
+
+    def end(self):
+        with self._cond:
+            self._busy -= 1
+            self._last = time.monotonic()
+            self._cond.notify_all()
+
+    def busy(self) -> int:
+        with self._cond:
+            return self._busy
+
+    def idle_seconds(self) -> float:
+        with self._cond:
+            return 0.0 if self._busy else time.monotonic() - self._last
+
+    def wait_idle(self, seconds: float):
+        """blokerer til der har været 'seconds' uden aktivitet og intet er i gang"""
+        with self._cond:
+            while True:
+                if self._busy:
+                    self._cond.wait()
+                    continue
+                remaining = seconds - (time.monotonic() - self._last)
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining)
+
+    def drain(self, timeout: float) -> bool:
+        """stop: vent til alt igangværende er færdigt (eller timeout). True = tømt"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self.stopping = True
+            return self._cond.wait_for(lambda: self._busy == 0, timeout=max(0.0, deadline - time.monotonic()))
+
+
+activity = ActivityTracker()
+
+
+# ---------- målinger: spans pr. fase -> Server-Timing og /metrics ----------
+HISTOGRAM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_spans = threading.local()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Måler en fase, hvis tråden samler (collect_spans) – ellers koster den ét opslag.
+    Spans lægges kun i listen; histogrammerne opdateres ét sted (observe_spans),
+    så målinger fra worker-processer ikke tælles to gange.
+    """
+    spans = getattr(_spans, "current", None)
+    if spans is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, time.perf_counter() - t0))
+
+
+@contextmanager
+def collect_spans():
+    """saml spans fra denne tråd i en ny liste – en ydre samler får dem ikke automatisk"""
+    prev = getattr(_spans, "current", None)
+    _spans.current = spans = []
+    try:
+        yield spans
+    finally:
+        _spans.current = prev
+
+
+class Histograms:
+    """
+    Prometheus-histogrammer: (navn, labels) -> tæller pr. bucket + sum.
+    Én lås og en bisect pr. observation – billigt nok til altid at være slået til.
+    """
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+        self._help = {}
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def observe(self, name: str, labels: tuple, seconds: float):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get((name, labels))
+            if series is None:
+                series = self._series[(name, labels)] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += seconds
+
+    def render(self) -> str:
+        """Prometheus' tekstformat (kumulative buckets, _sum og _count)"""
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        seen = set()
+        for (name, labels), (counts, total) in items:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            base = ",".join(f'{k}="{_label_value(v)}"' for k, v in labels)
+            sep = "," if base else ""
+            running = 0
+            for le, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le_text = "+Inf" if le == float("inf") else repr(le)
+                lines.append(f'{name}_bucket{{{base}{sep}le="{le_text}"}} {running}')
+            lines.append(f"{name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{name}_count{{{base}}} {running}")
+        return "\n".join(lines) + "\n"
+
+
+def _label_value(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Histograms()
+metrics.describe("bc_request_duration_seconds", "Tid pr. request til svaret er klar (uden streaming af body)")
+metrics.describe("bc_phase_duration_seconds", "Tid pr. fase i load_json, load_docx og generering")
+
+
+def observe_spans(route: str, spans):
+    """læg færdige spans (fra denne proces eller en worker) i fase-histogrammet"""
+    if not METRICS_ENABLED:
+        return
+    for name, seconds in spans or ():
+        metrics.observe("bc_phase_duration_seconds", (("route", route), ("phase", name)), seconds)
+
+
+class MemoryProfiler:
+    """
+    tracemalloc-vinduer omkring generering og upload: hvor meget hukommelse blev tilbage,
+    og hvilke linjer allokerede den (top-N forskel). De seneste vinduer gemmes i en ring.
+    Snapshots er for hele processen – kører flere vinduer samtidig, markeres de 'overlapping',
+    fordi forskellen så også indeholder de andres allokeringer.
+    Det, cachen (cache_bytes) voksede med i vinduet, er bevidst beholdt og trækkes fra 'retained' (vises som
+    'cache_kb'). Vinduer med out_of_process=True lavede det tunge arbejde i worker-processer, som tracemalloc
+    her ikke ser – de gemmes med mærket, men markeres aldrig som lækage.
+    """
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, enabled: bool, top: int, threshold_mb: float, keep: int, cache_bytes=None):
+        self.enabled = enabled
+        self.cache_bytes = cache_bytes or (lambda: 0)
+        self.top = top
+        self.threshold_bytes = int(threshold_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=keep)
+        self._active = {}  # vindue-id -> overlapper
+        self._flagged = 0
+        self._windows = 0
+        self._baseline = None
+
+    def start(self):
+        """varm bibliotekerne op (ellers ligner første generering en lækage) og start tracemalloc"""
+        with self._lock:
+            if not self.enabled or self._baseline is not None:
+                return
+            warm_up()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._baseline = self._snapshot()
+
+    def _snapshot(self):
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    @staticmethod
+    def _top(diff, limit: int) -> list:
+        """de linjer, der er vokset mest"""
+        diff = sorted((d for d in diff if d.size_diff > 0), key=lambda d: d.size_diff, reverse=True)
+        return [
+            {
+                "where": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                "size_diff_kb": round(d.size_diff / 1024, 1),
+                "count_diff": d.count_diff,
+            }
+            for d in diff[:limit]
+        ]
+
+    @contextmanager
+    def window(self, label: str, out_of_process: bool = False, **info):
+        if not self.enabled:
+            yield
+            return
+        self.start()
+        window_id = uuid.uuid4().hex
+        with self._lock:
+            alone = not self._active
+            for other in self._active:
+                self._active[other] = True
+            self._active[window_id] = not alone
+        before = self._snapshot()
+        cache_before = self.cache_bytes()
+        current_before = tracemalloc.get_traced_memory()[0]
+        if alone:
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            after = self._snapshot()
+            cache_growth = self.cache_bytes() - cache_before
+            with self._lock:
+                overlapping = self._active.pop(window_id)
+            diff = after.compare_to(before, "lineno")
+            retained = sum(d.size_diff for d in diff) - cache_growth
+            record = dict(
+                info,
+                label=label,
+                at=datetime.now().isoformat(timespec="seconds"),
+                seconds=round(time.perf_counter() - t0, 3),
+                retained_kb=round(retained / 1024, 1),
+                cache_kb=round(cache_growth / 1024, 1),
+                peak_kb=round(max(0, peak - current_before) / 1024, 1),
+                overlapping=overlapping,
+                out_of_process=out_of_process,
+                flagged=retained > self.threshold_bytes and not out_of_process,
+                top=self._top(diff, self.top),
+            )
+            with self._lock:
+                self._records.append(record)
+                self._windows += 1
+                self._flagged += record["flagged"]
+            if record["flagged"]:
+                print(f"[hukommelse] {label} beholdt {retained / 1024 / 1024:.1f} MB "
+                      f"(grænse {self.threshold_bytes / 1024 / 1024:g} MB) – se /diagnostics/memory")
+
+    def report(self, top: int = None) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        self.start()
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            records = list(self._records)
+            windows, flagged = self._windows, self._flagged
+        return {
+            "enabled": True,
+            "traced_current_mb": round(current / 1024 / 1024, 2),
+            "traced_peak_mb": round(peak / 1024 / 1024, 2),
+            "threshold_mb": round(self.threshold_bytes / 1024 / 1024, 2),
+            "windows": windows,
+            "flagged": flagged,
+            "recent": records[::-1],
+            "growth_since_start": self._top(self._snapshot().compare_to(self._baseline, "lineno"), top or self.top),
+        }
+
+
+memory_profiler = MemoryProfiler(
+    MEMPROFILE_ENABLED, MEMPROFILE_TOP, MEMPROFILE_THRESHOLD_MB, MEMPROFILE_KEEP,
+    # bytes i artefakt-cachene (defineres i AFSNIT 7a) – det de vokser med, er ikke en lækage
+    cache_bytes=lambda: artifact_cache.stats()["bytes"] + artifact_piece_cache.stats()["bytes"],
+)
+
+
+def server_timing(spans) -> str:
+    """spans -> Server-Timing-headerværdi (ms); samme fase flere gange lægges sammen"""
+    totals = OrderedDict()
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
 def ensure_output_dir() -> str:
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -69,7 +464,14 @@ def safe_name(s: str) -> str:
     return s
 
 
+# ét punktum uden komma, og ikke fulgt af præcis tre cifre: decimalpunktum ("2.5" fra type=number-felterne),
+# ikke dansk tusindtalsseparator ("1.000", "12.500")
+# "0.125" har intet tusindtal at adskille, så et foranstillet "0." er altid decimalpunktum
+_DOT_DECIMAL_RE = re.compile(r"[-+]?(0?\.\d+|\d*\.(\d{1,2}|\d{4,}))")
+
+
 def to_number(v, default=0.0) -> float:
+    """tal fra formular/spørgeskema: dansk "1.234,5", men også "2.5" som browserens talfelter sender"""
     if v is None:
         return default
     if isinstance(v, (int, float)):
@@ -78,6 +480,8 @@ def to_number(v, default=0.0) -> float:
     if not s:
         return default
     s = s.replace(" ", "")
+    if _DOT_DECIMAL_RE.fullmatch(s):
+        return float(s)
     s = s.replace(".", "").replace(",", ".")
     try:
         return float(s)
@@ -129,19 +533,96 @@ def get_logo_path_for_docs():
     return None
 
 
-def add_logo_header(doc: Document):
-    """læg logo i header til venstre – crasher ikke hvis der mangler logo"""
+# størrelser logoet bruges i
+LOGO_DOCX_WIDTH_IN = 1.3
+LOGO_DOCX_DPI = 192  # 2x skærm-opløsning, så det stadig er skarpt ved print
+LOGO_XLSX_SIZE = (180, 90)
+
+
+def _png_bytes(img) -> bytes:
+    bio = io.BytesIO()
+    img.save(bio, format="PNG", optimize=True)
+    return bio.getvalue()
+
+
+@lru_cache(maxsize=1)
+def get_logo_assets():
+    """
+    Finder, læser og skalerer logoet én gang pr. proces.
+    Returnerer {"path", "docx": PNG til Word-header, "xlsx": PNG i 180x90} – eller None uden logo.
+    Uden Pillow bruges originalfilen i begge størrelser.
+    """
     logo_path = get_logo_path_for_docs()
     if not logo_path:
-        return
+        return None
     try:
-        section = doc.sections[0]
-        header = section.header
-        paragraph = header.paragraphs[0]
-        run = paragraph.add_run()
-        run.add_picture(logo_path, width=Inches(1.3))
+        with open(logo_path, "rb") as fh:
+            raw = fh.read()
+    except OSError:
+        return None
+
+    assets = {"path": logo_path, "docx": raw, "xlsx": raw}
+    try:
+        from PIL import Image as PILImage
+    except ImportError:
+        return assets
+    try:
+        with PILImage.open(io.BytesIO(raw)) as img:
+            img.load()
+            w = round(LOGO_DOCX_WIDTH_IN * LOGO_DOCX_DPI)
+            h = max(1, round(img.height * w / img.width))
+            if img.width > w:
+                assets["docx"] = _png_bytes(img.resize((w, h), PILImage.LANCZOS))
+            assets["xlsx"] = _png_bytes(img.resize(LOGO_XLSX_SIZE, PILImage.LANCZOS))
     except Exception:
         pass
+    return assets
+
+
+@lru_cache(maxsize=1)
+def _cached_xl_image_class():
+    from openpyxl.drawing.image import Image as XLImage
+
+    class CachedXLImage(XLImage):
+        """openpyxl-billede direkte fra færdige PNG-bytes – ingen PIL-afkodning pr. build"""
+
+        def __init__(self, data: bytes, width: int, height: int):
+            self.ref = None
+            self._png = data
+            self.width, self.height = width, height
+            self.format = "png"
+
+        def _data(self):
+            return self._png
+
+    return CachedXLImage
+
+
+def add_logo_header(doc):
+    """læg logo i header til venstre – crasher ikke hvis der mangler logo"""
+    from docx.shared import Inches
+    with span("logo"):
+        assets = get_logo_assets()
+        if not assets:
+            return
+        try:
+            section = doc.sections[0]
+            header = section.header
+            paragraph = header.paragraphs[0]
+            run = paragraph.add_run()
+            run.add_picture(io.BytesIO(assets["docx"]), width=Inches(LOGO_DOCX_WIDTH_IN))
+        except Exception:
+            pass
+
+
+@lru_cache(maxsize=1)
+def _numpy():
+    """numpy er valgfri (portefølje, Monte Carlo) – None hvis den ikke er installeret"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
 
 
 # ============================================================
@@ -176,6 +657,18 @@ def empty_form() -> dict:
         "rst_tid": "3",
         "afhaengigheder": "Afhænger af HR-data, licens, godkendelse fra IT",
         "extra_json": "",
+        # usikkerhed: ± procent omkring de angivne værdier, eller eksplicit min/max pr. felt
+        "usikkerhed_pct": "20",
+        "varighed_min_min": "",
+        "varighed_min_max": "",
+        "frekvens_pr_uge_min": "",
+        "frekvens_pr_uge_max": "",
+        "automationsgrad_pct_min": "",
+        "automationsgrad_pct_max": "",
+        "investering_kr_min": "",
+        "investering_kr_max": "",
+        "drift_aarlig_kr_min": "",
+        "drift_aarlig_kr_max": "",
     }
 
 
@@ -214,10 +707,217 @@ def calc_metrics(c: dict) -> dict:
     }
 
 
+# ============================================================
+# AFSNIT 3b – PORTEFØLJE-BEREGNING (mange cases på én gang)
+# ============================================================
+# samme felter og defaults som calc_metrics
+METRIC_INPUTS = {
+    "varighed_min": 0.0,
+    "frekvens_pr_uge": 0.0,
+    "aarSloen_kr": 450000.0,
+    "automationsgrad_pct": 80.0,
+    "investering_kr": 60000.0,
+    "drift_aarlig_kr": 0.0,
+}
+
+
+def cases_to_columns(cases) -> dict:
+    """liste af formular-dicts -> {felt: liste af værdier} for de felter beregningen bruger"""
+    return {key: [c.get(key) for c in cases] for key in METRIC_INPUTS}
+
+
+def _as_column(values, default: float, n: int):
+    np = _numpy()
+    if values is None:
+        return np.full(n, default, dtype=np.float64)
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iuf":
+        return arr.astype(np.float64)
+    # blandet tal og tekst: np.asarray har lavet tallene om til tekst ("1.125" -> 1125 i to_number),
+    # så vi går tilbage til de oprindelige værdier og tolker hvert element for sig
+    arr = np.asarray(values, dtype=object)
+    return np.fromiter((to_number(v, default) for v in arr.ravel()), dtype=np.float64, count=arr.size)
+
+
+def calc_metrics_portfolio(cases) -> dict:
+    """
+    Vektoriseret udgave af calc_metrics.
+    cases: enten en liste af formular-dicts eller kolonner {felt: array/liste}.
+    Returnerer {nøgletal: array} med præcis samme tal som calc_metrics giver række for række.
+    Uden NumPy falder den tilbage til calc_metrics pr. række (lister i stedet for arrays).
+    """
+    np = _numpy()
+    if isinstance(cases, (list, tuple)):
+        cases = cases_to_columns(cases)
+
+    n = 0
+    for values in cases.values():
+        if values is not None:
+            n = len(values)
+            break
+
+    if np is None:
+        rows = [
+            calc_metrics({key: (cases.get(key) or [None] * n)[i] for key in METRIC_INPUTS})
+            for i in range(n)
+        ]
+        keys = rows[0].keys() if rows else calc_metrics({}).keys()
+        return {k: [r[k] for r in rows] for k in keys}
+
+    varighed_min = _as_column(cases.get("varighed_min"), METRIC_INPUTS["varighed_min"], n)
+    frekvens_pr_uge = _as_column(cases.get("frekvens_pr_uge"), METRIC_INPUTS["frekvens_pr_uge"], n)
+    aarsloen_kr = _as_column(cases.get("aarSloen_kr"), METRIC_INPUTS["aarSloen_kr"], n)
+    automationsgrad_pct = _as_column(cases.get("automationsgrad_pct"), METRIC_INPUTS["automationsgrad_pct"], n)
+    investering_kr = _as_column(cases.get("investering_kr"), METRIC_INPUTS["investering_kr"], n)
+    drift_aarlig_kr = _as_column(cases.get("drift_aarlig_kr"), METRIC_INPUTS["drift_aarlig_kr"], n)
+
+    # samme regnerækkefølge som calc_metrics, så resultatet er bit-for-bit ens
+    minutter_pr_aar = varighed_min * frekvens_pr_uge * 52
+    timer_pr_aar = minutter_pr_aar / 60.0
+    fte = np.where(timer_pr_aar > 0, timer_pr_aar / 1540.0, 0.0)
+    timeloen = np.where(aarsloen_kr > 0, aarsloen_kr / 1540.0, 0.0)
+
+    omkostning_foer = timer_pr_aar * timeloen
+    efter_timer = timer_pr_aar * (1 - automationsgrad_pct / 100.0)
+    omkostning_efter = efter_timer * timeloen + drift_aarlig_kr
+
+    aarlig_besparelse = omkostning_foer - omkostning_efter
+    positiv = aarlig_besparelse > 0
+    break_even_aar = np.divide(
+        investering_kr, aarlig_besparelse,
+        out=np.zeros(n, dtype=np.float64), where=positiv,
+    )
+
+    return {
+        "minutter_pr_aar": minutter_pr_aar,
+        "timer_pr_aar": timer_pr_aar,
+        "fte": fte,
+        "timeloen": timeloen,
+        "omkostning_foer": omkostning_foer,
+        "omkostning_efter": omkostning_efter,
+        "aarlig_besparelse": aarlig_besparelse,
+        "break_even_aar": break_even_aar,
+    }
+
+
+# ============================================================
+# AFSNIT 3c – USIKKERHED (Monte Carlo)
+# ============================================================
+# antal simuleringer pr. case (0 = slået fra)
+MC_SAMPLES = int(os.environ.get("BC_MC_SAMPLES") or 100000)
+MC_SEED = 1  # fast seed, så samme input giver samme dokumenter
+
+# felter der er estimater – likely = værdien i formularen
+UNCERTAIN_FIELDS = [
+    ("varighed_min", "Varighed (min)"),
+    ("frekvens_pr_uge", "Frekvens (gange/uge)"),
+    ("automationsgrad_pct", "Automationsgrad (%)"),
+    ("investering_kr", "Investering (kr)"),
+    ("drift_aarlig_kr", "Årlig drift/licens (kr)"),
+]
+
+# felterne formularen viser som <input type=number>
+NUMERIC_FIELDS = [
+    "varighed_min", "frekvens_pr_uge", "arbejdsdage_pr_aar", "aarSloen_kr",
+    "automationsgrad_pct", "investering_kr", "drift_aarlig_kr", "usikkerhed_pct",
+] + [f"{key}_{end}" for key, _label in UNCERTAIN_FIELDS for end in ("min", "max")]
+
+
+def metric_ranges(c: dict) -> dict:
+    """
+    {felt: (min, likely, max)} for de usikre felter.
+    Eksplicit <felt>_min / <felt>_max vinder, ellers ± usikkerhed_pct omkring likely.
+    """
+    spread = max(to_number(c.get("usikkerhed_pct"), 0.0), 0.0) / 100.0
+    ranges = {}
+    for key, _label in UNCERTAIN_FIELDS:
+        likely = to_number(c.get(key), METRIC_INPUTS[key])
+        lo = to_number(c.get(f"{key}_min"), likely * (1 - spread))
+        hi = to_number(c.get(f"{key}_max"), likely * (1 + spread))
+        lo, hi = max(min(lo, hi), 0.0), max(lo, hi, 0.0)
+        if key == "automationsgrad_pct":
+            lo, hi = min(lo, 100.0), min(hi, 100.0)
+        likely = min(max(likely, lo), hi)
+        ranges[key] = (lo, likely, hi)
+    return ranges
+
+
+def simulate_metrics(c: dict, samples: int = None, seed: int = MC_SEED) -> dict:
+    """
+    Monte Carlo på calc_metrics: trekantsfordeling (min/likely/max) pr. usikkert felt,
+    alle simuleringer trækkes og regnes på én gang som NumPy-arrays.
+    Returnerer P10/P50/P90 for årlig besparelse og break-even – eller None hvis slået fra / uden NumPy.
+    """
+    np = _numpy()
+    samples = MC_SAMPLES if samples is None else samples
+    if np is None or samples <= 0:
+        return None
+
+    rng = np.random.default_rng(seed)
+    ranges = metric_ranges(c)
+    columns = {"aarSloen_kr": np.full(samples, to_number(c.get("aarSloen_kr"), METRIC_INPUTS["aarSloen_kr"]))}
+    for key, (lo, likely, hi) in ranges.items():
+        if hi > lo:
+            columns[key] = rng.triangular(lo, likely, hi, samples)
+        else:
+            columns[key] = np.full(samples, likely)
+
+    sim = calc_metrics_portfolio(columns)
+    besparelse = sim["aarlig_besparelse"]
+    positiv = besparelse > 0
+    # uden positiv besparelse tjenes investeringen aldrig hjem -> uendelig break-even
+    break_even = np.where(positiv, sim["break_even_aar"], np.inf)
+
+    q = [0.10, 0.50, 0.90]
+    p_besp = np.quantile(besparelse, q, method="inverted_cdf")
+    p_be = np.quantile(break_even, q, method="inverted_cdf")
+    return {
+        "samples": samples,
+        "ranges": ranges,
+        "andel_positiv": float(positiv.mean()),
+        "aarlig_besparelse": {"p10": float(p_besp[0]), "p50": float(p_besp[1]), "p90": float(p_besp[2])},
+        "break_even_aar": {"p10": float(p_be[0]), "p50": float(p_be[1]), "p90": float(p_be[2])},
+    }
+
+
+def fmt_years(x) -> str:
+    if x == float("inf"):
+        return "tjenes ikke hjem"
+    return f"{fmt_num(x, 1)} år"
+
+
 # ============================================================
 # AFSNIT 4 – WORD SPØRGESKEMA
 # ============================================================
+# spørgeskemaets felter (label i Word -> formular-nøgle)
+QUESTIONNAIRE_FIELDS = [
+    ("Procesnavn", "procesnavn"),
+    ("Formål", "formaal"),
+    ("Udførende (roller/navne)", "udfoerende"),
+    ("Procesejer", "proces_ejer"),
+    ("Sponsor / bestiller", "sponsor"),
+    ("SME / procesekspert", "sme"),
+    ("RPA-udvikler", "rpa_udvikler"),
+    ("Systemer i brug", "systemer"),
+    ("Varighed pr. opgave (min)", "varighed_min"),
+    ("Frekvens (gange/uge)", "frekvens_pr_uge"),
+    ("Arbejdsdage pr. år", "arbejdsdage_pr_aar"),
+    ("Årsløn (kr)", "aarSloen_kr"),
+    ("Automatiseringsgrad (%)", "automationsgrad_pct"),
+    ("Investering (kr)", "investering_kr"),
+    ("Årlig licens/drift (kr)", "drift_aarlig_kr"),
+    ("Input", "input"),
+    ("Output", "output"),
+    ("Typiske fejl/undtagelser", "fejl"),
+    ("Kvalitative gevinster", "kvalitative"),
+    ("AS-IS beskrivelse (sådan gør vi i dag)", "as_is_beskrivelse"),
+    ("TO-BE beskrivelse (sådan skal robotten gøre)", "to_be_beskrivelse"),
+    ("Afhængigheder", "afhaengigheder"),
+]
+
+
 def build_word_questionnaire() -> bytes:
+    from docx import Document
     doc = Document()
 
     # logo i header
@@ -226,31 +926,7 @@ def build_word_questionnaire() -> bytes:
     doc.add_heading("Business Case – spørgeskema", level=1)
     doc.add_paragraph("Udfyld felterne og upload dokumentet i BusinessCaseGPT.")
 
-    questions = [
-        ("Procesnavn", "procesnavn"),
-        ("Formål", "formaal"),
-        ("Udførende (roller/navne)", "udfoerende"),
-        ("Procesejer", "proces_ejer"),
-        ("Sponsor / bestiller", "sponsor"),
-        ("SME / procesekspert", "sme"),
-        ("RPA-udvikler", "rpa_udvikler"),
-        ("Systemer i brug", "systemer"),
-        ("Varighed pr. opgave (min)", "varighed_min"),
-        ("Frekvens (gange/uge)", "frekvens_pr_uge"),
-        ("Arbejdsdage pr. år", "arbejdsdage_pr_aar"),
-        ("Årsløn (kr)", "aarSloen_kr"),
-        ("Automatiseringsgrad (%)", "automationsgrad_pct"),
-        ("Investering (kr)", "investering_kr"),
-        ("Årlig licens/drift (kr)", "drift_aarlig_kr"),
-        ("Input", "input"),
-        ("Output", "output"),
-        ("Typiske fejl/undtagelser", "fejl"),
-        ("Kvalitative gevinster", "kvalitative"),
-        ("AS-IS beskrivelse (sådan gør vi i dag)", "as_is_beskrivelse"),
-        ("TO-BE beskrivelse (sådan skal robotten gøre)", "to_be_beskrivelse"),
-        ("Afhængigheder", "afhaengigheder"),
-    ]
-    for title, _key in questions:
+    for title, _key in QUESTIONNAIRE_FIELDS:
         p = doc.add_paragraph()
         r = p.add_run(f"{title}: ")
         r.bold = True
@@ -261,243 +937,850 @@ def build_word_questionnaire() -> bytes:
     return bio.getvalue()
 
 
-def parse_docx_to_form(file_storage) -> dict:
+@lru_cache(maxsize=1)
+def questionnaire_docx() -> tuple:
+    """(bytes, etag) – spørgeskemaet ændrer sig ikke mens programmet kører, så det bygges én gang"""
+    content = build_word_questionnaire()
+    return content, hashlib.sha256(content).hexdigest()[:20]
+
+
+# ---------- indlæsning af udfyldte spørgeskemaer ----------
+# nøgleord pr. felt (normaliserede, hele ord). (ord, felt, vægt, kun_først)
+# kun_først = ordet skal stå først i labelen (fx "Input", men ikke "Typiske fejl ved input")
+LABEL_KEYWORDS = [
+    ("procesnavn", "procesnavn", 2, False),
+    ("proces navn", "procesnavn", 2, False),
+    ("process name", "procesnavn", 2, False),
+    ("formaal", "formaal", 2, False),
+    ("objective", "formaal", 2, False),
+    ("udfoerende", "udfoerende", 2, False),
+    ("procesejer", "proces_ejer", 2, False),
+    ("proces ejer", "proces_ejer", 2, False),
+    ("process owner", "proces_ejer", 2, False),
+    ("forretningsansvarlig", "proces_ejer", 1, False),
+    ("sponsor", "sponsor", 2, False),
+    ("bestiller", "sponsor", 1, False),
+    ("sme", "sme", 2, False),
+    ("procesekspert", "sme", 1, False),
+    ("fagperson", "sme", 1, False),
+    ("rpa udvikler", "rpa_udvikler", 3, False),
+    ("rpa", "rpa_udvikler", 1, False),
+    ("udvikler", "rpa_udvikler", 1, False),
+    ("teknisk ansvarlig", "rpa_udvikler", 1, False),
+    ("systemer", "systemer", 2, False),
+    ("varighed", "varighed_min", 2, False),
+    ("frekvens", "frekvens_pr_uge", 2, False),
+    ("arbejdsdage", "arbejdsdage_pr_aar", 2, False),
+    ("aarsloen", "aarSloen_kr", 2, False),
+    ("automatiseringsgrad", "automationsgrad_pct", 2, False),
+    ("automationsgrad", "automationsgrad_pct", 2, False),
+    ("investering", "investering_kr", 2, False),
+    ("licens", "drift_aarlig_kr", 2, False),
+    ("drift", "drift_aarlig_kr", 2, False),
+    ("input", "input", 2, True),
+    ("output", "output", 2, True),
+    ("fejl", "fejl", 2, False),
+    ("undtagelser", "fejl", 2, False),
+    ("kvalitative", "kvalitative", 2, False),
+    ("as is", "as_is_beskrivelse", 3, False),
+    ("to be", "to_be_beskrivelse", 3, False),
+    ("afhaengigheder", "afhaengigheder", 2, False),
+    ("afhaengighed", "afhaengigheder", 2, False),
+    ("kritikalitet", "kritikalitet", 2, False),
+]
+
+_FOLD = str.maketrans({"æ": "ae", "ø": "oe", "å": "aa"})
+_NON_WORD_RE = re.compile(r"[^0-9a-z]+")
+
+
+def _norm_label(label: str) -> str:
+    return _NON_WORD_RE.sub(" ", (label or "").lower().translate(_FOLD)).strip()
+
+
+# præcise labels (spørgeskemaets egne + feltnøglerne) -> felt
+_EXACT_LABELS = {_norm_label(title): key for title, key in QUESTIONNAIRE_FIELDS}
+_EXACT_LABELS.update({_norm_label(key): key for key in empty_form()})
+
+# første ord i en nøgleords-frase -> [(alle ord, felt, vægt, kun_først)]
+_KEYWORD_INDEX = {}
+for _phrase, _field, _weight, _first in LABEL_KEYWORDS:
+    _words = tuple(_phrase.split())
+    _KEYWORD_INDEX.setdefault(_words[0], []).append((_words, _field, _weight, _first))
+
+
+def match_label(label: str):
+    """label -> (felt, sikkerhed 0..1) eller (None, 0.0)"""
+    norm = _norm_label(label)
+    if not norm:
+        return None, 0.0
+    if norm in _EXACT_LABELS:
+        return _EXACT_LABELS[norm], 1.0
+
+    words = norm.split()
+    scores = {}
+    for pos, word in enumerate(words):
+        for phrase, field, weight, first_only in _KEYWORD_INDEX.get(word, ()):
+            if first_only and pos != 0:
+                continue
+            if tuple(words[pos:pos + len(phrase)]) == phrase:
+                scores[field] = scores.get(field, 0) + weight
+    if not scores:
+        return None, 0.0
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    best_field, best = ranked[0]
+    second = ranked[1][1] if len(ranked) > 1 else 0
+    return best_field, round(0.9 * best / (best + second), 2)
+
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def qn(tag: str) -> str:
+    """'w:t' -> '{namespace}t' (som docx.oxml.ns.qn, men uden at importere python-docx)"""
+    _prefix, name = tag.split(":")
+    return "{%s}%s" % (W_NS, name)
+
+
+_W_P = qn("w:p")
+_W_TR = qn("w:tr")
+_W_TC = qn("w:tc")
+_W_SDT = qn("w:sdt")
+_W_BODY = qn("w:body")
+_W_TEXT_TAGS = {qn("w:t"): None, qn("w:tab"): "\t", qn("w:br"): "\n", qn("w:cr"): "\n"}
+
+
+def _xml_text(el) -> str:
+    out = []
+    for node in el.iter(*_W_TEXT_TAGS):
+        out.append(node.text or "" if node.tag == qn("w:t") else _W_TEXT_TAGS[node.tag])
+    return "".join(out)
+
+
+def _cell_text(tc) -> str:
+    return "\n".join(_xml_text(p) for p in tc.iter(_W_P)).strip()
+
+
+def parse_docx_questionnaire(file_storage):
+    """
+    Hurtig parser til udfyldte spørgeskemaer: streamer word/document.xml direkte fra zip'en.
+    Forstår "Label: værdi"-afsnit, tabeller (label | værdi) og indholdskontroller (tag/titel = felt).
+    Returnerer (formular, sikkerhed pr. fundet felt) – eller (None, {}) hvis filen ikke kan læses.
+    """
+    from lxml import etree
+    source = getattr(file_storage, "stream", file_storage)
     try:
-        doc = Document(file_storage)
+        zf = zipfile.ZipFile(source)
+        xml = zf.open("word/document.xml")
     except Exception:
-        return None
+        return None, {}
 
     mapping = empty_form()
-    for para in doc.paragraphs:
-        line = (para.text or "").strip()
-        if not line or ":" not in line:
-            continue
-        keypart, val = line.split(":", 1)
-        key = keypart.lower().strip()
-        val = val.strip()
-
-        if "procesnavn" in key:
-            mapping["procesnavn"] = val
-        elif "formål" in key or "formaal" in key:
-            mapping["formaal"] = val
-        elif "udførende" in key or "udfoerende" in key:
-            mapping["udfoerende"] = val
-        elif "procesejer" in key or "proces-ejer" in key:
-            mapping["proces_ejer"] = val
-        elif "sponsor" in key:
-            mapping["sponsor"] = val
-        elif "sme" in key:
-            mapping["sme"] = val
-        elif "rpa" in key:
-            mapping["rpa_udvikler"] = val
-        elif "systemer" in key:
-            mapping["systemer"] = val
-        elif "varighed" in key:
-            mapping["varighed_min"] = val
-        elif "frekvens" in key:
-            mapping["frekvens_pr_uge"] = val
-        elif "arbejdsdage" in key:
-            mapping["arbejdsdage_pr_aar"] = val
-        elif "årsløn" in key or "aarsløn" in key or "årsloen" in key:
-            mapping["aarSloen_kr"] = val
-        elif "automatiseringsgrad" in key:
-            mapping["automationsgrad_pct"] = val
-        elif "investering" in key:
-            mapping["investering_kr"] = val
-        elif "licens" in key or "drift" in key:
-            mapping["drift_aarlig_kr"] = val
-        elif key.startswith("input"):
-            mapping["input"] = val
-        elif key.startswith("output"):
-            mapping["output"] = val
-        elif "fejl" in key or "undtagelser" in key:
-            mapping["fejl"] = val
-        elif "kvalitative" in key:
-            mapping["kvalitative"] = val
-        elif "as-is" in key:
-            mapping["as_is_beskrivelse"] = val
-        elif "to-be" in key:
-            mapping["to_be_beskrivelse"] = val
-        elif "afhæng" in key or "afhaeng" in key:
-            mapping["afhaengigheder"] = val
+    confidence = {}
+
+    def put(field, value, conf):
+        if field and conf >= confidence.get(field, 0.0):
+            mapping[field] = value.strip()
+            confidence[field] = conf
+
+    def put_line(line):
+        line = line.strip()
+        if ":" not in line:
+            return
+        label, value = line.split(":", 1)
+        field, conf = match_label(label)
+        put(field, value, conf)
+
+    in_cell = 0
+    try:
+        with zf, xml:
+            for event, el in etree.iterparse(xml, events=("start", "end")):
+                tag = el.tag
+                if event == "start":
+                    if tag == _W_TC:
+                        in_cell += 1
+                    continue
+
+                if tag == _W_TC:
+                    in_cell -= 1
+                elif tag == _W_P and not in_cell:
+                    put_line(_xml_text(el))
+                elif tag == _W_TR:
+                    cells = [_cell_text(tc) for tc in el.iterchildren(_W_TC)]
+                    if len(cells) >= 2 and cells[0]:
+                        field, conf = match_label(cells[0].rstrip(":"))
+                        put(field, "\n".join(x for x in cells[1:] if x), conf)
+                    elif len(cells) == 1:
+                        put_line(cells[0])
+                elif tag == _W_SDT:
+                    props = el.find(qn("w:sdtPr"))
+                    content = el.find(qn("w:sdtContent"))
+                    if props is not None and content is not None:
+                        for prop in ("w:tag", "w:alias"):
+                            node = props.find(qn(prop))
+                            label = node.get(qn("w:val")) if node is not None else ""
+                            field, conf = match_label(label)
+                            if field:
+                                value = _xml_text(content) if content.find(_W_P) is None else _cell_text(content)
+                                # "Procesnavn: X" inde i en kontrol med samme felt -> kun X
+                                if ":" in value and match_label(value.split(":", 1)[0])[0] == field:
+                                    value = value.split(":", 1)[1]
+                                put(field, value, conf)
+                                break
+
+                # færdige elementer direkte under body smides væk, så hukommelsen ikke vokser
+                parent = el.getparent()
+                if parent is not None and parent.tag == _W_BODY:
+                    el.clear()
+                    while el.getprevious() is not None:
+                        del parent[0]
+    except etree.XMLSyntaxError:
+        return None, {}
+
+    return mapping, confidence
 
+
+def parse_docx_to_form(file_storage) -> dict:
+    mapping, _confidence = parse_docx_questionnaire(file_storage)
     return mapping
 
 
+EMPTY_FORM_KEYS = frozenset(empty_form())
+
+# de dele af en JSON-eksport formularen bruger (ud over top-level felter med samme navn)
+JSON_SECTIONS = ("process_overview", "timing_analysis")
+
+
+def _json_wanted(key: str) -> bool:
+    return key in JSON_SECTIONS or key in EMPTY_FORM_KEYS
+
+
+def json_subset(data: dict) -> dict:
+    return {k: v for k, v in data.items() if _json_wanted(k)}
+
+
+def store_raw_payload(stream) -> str:
+    """
+    Gemmer en upload i bidder under output/imports/<sha256>.json.
+    Samme indhold gemmes kun én gang. Returnerer stien.
+    """
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    tmp = os.path.join(IMPORT_DIR, f".upload_{uuid.uuid4().hex}.tmp")
+    with open(tmp, "wb") as out:
+        for chunk in iter(lambda: stream.read(1 << 16), b""):
+            digest.update(chunk)
+            out.write(chunk)
+    path = os.path.join(IMPORT_DIR, f"{digest.hexdigest()[:20]}.json")
+    if os.path.exists(path):
+        os.remove(tmp)
+    else:
+        os.replace(tmp, path)
+    return path
+
+
+def extract_json_sections(fp) -> dict:
+    """
+    Læser en JSON-fil (binær fil) inkrementelt og beholder kun det formularen bruger.
+    Alt andet (fx store event-lister) springes over uden at blive bygget i hukommelsen.
+    Uden ijson læses hele filen med json.load.
+    """
+    if fp.read(3) != b"\xef\xbb\xbf":
+        fp.seek(0)
+    if ijson is None:
+        data = json.load(fp)
+        if not isinstance(data, dict):
+            raise ValueError("forventede et JSON-objekt")
+        return json_subset(data)
+
+    out = {}
+    builder = None
+    for prefix, event, value in ijson.parse(fp, use_float=True):
+        if not prefix:
+            if event == "start_map" or event == "end_map":
+                continue
+            if event == "map_key":
+                key = value
+                builder = ijson.ObjectBuilder() if _json_wanted(key) else None
+                continue
+            raise ValueError("forventede et JSON-objekt")
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == key and event not in ("start_map", "start_array", "map_key"):
+                out[key] = builder.value
+                builder = None
+    return out
+
+
+def form_from_json(data: dict, raw_ref: str = None) -> dict:
+    """
+    JSON-eksport (egen formular eller process-mining-format) -> formular.
+    extra_json får kun de brugte sektioner + en henvisning til den rå fil (raw_ref).
+    """
+    f = empty_form()
+    for key in f.keys():
+        if key in data and not isinstance(data[key], dict):
+            f[key] = str(data[key])
+
+    po = data.get("process_overview") or {}
+    if po:
+        f["procesnavn"] = po.get("process_name", f["procesnavn"])
+        f["formaal"] = po.get("objective", f["formaal"])
+        systems = po.get("systems_in_scope")
+        if isinstance(systems, list):
+            f["systemer"] = ", ".join(systems)
+        elif isinstance(systems, str):
+            f["systemer"] = systems
+
+    ta = data.get("timing_analysis") or {}
+    if ta:
+        if "minutes_per_hire" in ta:
+            f["varighed_min"] = str(ta["minutes_per_hire"])
+        workdays = po.get("workdays_per_year") or ta.get("workdays_per_year")
+        if workdays:
+            f["arbejdsdage_pr_aar"] = str(workdays)
+        freq = ta.get("frequency_per_week")
+        if freq:
+            f["frekvens_pr_uge"] = str(freq)
+
+    extra = json_subset(data)
+    if raw_ref:
+        extra["raw_payload"] = raw_ref
+    f["extra_json"] = json.dumps(extra, indent=2, ensure_ascii=False)
+    return f
+
+
 # ============================================================
-# AFSNIT 5 – WORD PDD / RTS
+# AFSNIT 5 – WORD-LAYOUT (fælles for PDD og ledelsesbeskrivelse)
 # ============================================================
-def build_word_pdd(path: str, c: dict, m: dict):
+# Dokumenterne er beskrevet som lister af blokke:
+#   ("heading", tekst, niveau)   ("title", tekst, niveau)   ("p", tekst)   ("bold", tekst)
+#   ("table", [(label, tekst), ...])   ("if", nøgle, [blokke])  – kun med, hvis værdien er sand
+# Tekster med {felt} udfyldes pr. case; resten er faste og ligger færdige i skabelonen.
+
+# kompilerede skabeloner (logo, styles, faste afsnit) – slå fra med BC_DOCX_SKELETONS=0
+DOCX_SKELETONS = os.environ.get("BC_DOCX_SKELETONS", "1") != "0"
+
+
+def _iter_blocks(layout, cond=None):
+    """flad layoutet ud til (blok, betingelse)"""
+    for block in layout:
+        if block[0] == "if":
+            yield from _iter_blocks(block[2], block[1])
+        else:
+            yield block, cond
+
+
+def _add_block(doc, block, text_of):
+    """tilføj én blok til doc; text_of(skabelon) giver den tekst der skal stå"""
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    kind = block[0]
+    if kind == "heading":
+        return doc.add_heading(text_of(block[1]), level=block[2])
+    if kind == "title":
+        title = doc.add_heading(text_of(block[1]), level=block[2])
+        title.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        return title
+    if kind == "p":
+        return doc.add_paragraph(text_of(block[1]))
+    if kind == "bold":
+        para = doc.add_paragraph(text_of(block[1]))
+        para.runs[0].bold = True
+        return para
+    if kind == "table":
+        table = doc.add_table(rows=0, cols=2)
+        for label, value in block[1]:
+            row = table.add_row().cells
+            row[0].text = text_of(label)
+            row[1].text = text_of(value)
+        return table
+    raise ValueError(f"ukendt blok: {kind}")
+
+
+def _render_docx_classic(layout, v: dict):
+    """den oprindelige måde: tomt Document(), logo, alle blokke, og 11 pt på alle runs til sidst"""
+    from docx import Document
+    from docx.shared import Pt
     doc = Document()
+    add_logo_header(doc)
+    for block, cond in _iter_blocks(layout):
+        if cond and not v.get(cond):
+            continue
+        _add_block(doc, block, lambda t: t.format(**v))
 
-    # logo i header
+    for para in doc.paragraphs:
+        for run in para.runs:
+            run.font.size = Pt(11)
+    return doc
+
+
+_skeletons = {}
+_skeletons_lock = threading.Lock()
+
+
+def _compile_skeleton(layout):
+    """
+    Byg dokumentet én gang med skabelon-teksterne stående.
+    Returnerer (doc, slots) – slots = [(body-index, skabelon, betingelse, celle)] for alt der skal udfyldes/fjernes.
+    """
+    from docx import Document
+    from docx.shared import Pt
+    doc = Document()
+    # 11 pt som standard – også overskrifterne, så der ikke skal sættes størrelse pr. run
+    for name in ("Normal", "Heading 1", "Heading 2", "Heading 3"):
+        doc.styles[name].font.size = Pt(11)
     add_logo_header(doc)
 
-    doc.add_heading(f"PDD / RTS – {c.get('procesnavn','Proces')}", level=1)
+    added = []
+    for block, cond in _iter_blocks(layout):
+        added.append((_add_block(doc, block, lambda t: t), block, cond))
+
+    body = list(doc.element.body)
+    slots = []
+    for obj, block, cond in added:
+        idx = body.index(obj._element)
+        if block[0] == "table":
+            for r, (label, value) in enumerate(block[1]):
+                for col, tmpl in ((0, label), (1, value)):
+                    if "{" in tmpl:
+                        slots.append((idx, tmpl, cond, (r, col)))
+            if cond:
+                slots.append((idx, "", cond, None))
+        elif "{" in block[1] or cond:
+            slots.append((idx, block[1], cond, None))
+    return doc, slots
+
+
+def _render_docx_skeleton(kind: str, layout, v: dict):
+    with _skeletons_lock:
+        if kind not in _skeletons:
+            _skeletons[kind] = _compile_skeleton(layout)
+        skeleton, slots = _skeletons[kind]
+
+    doc = copy.deepcopy(skeleton)
+    body_el = doc.element.body
+    body = list(body_el)
+    removed = set()
+    for idx, tmpl, cond, cell in slots:
+        el = body[idx]
+        if cond and not v.get(cond):
+            if idx not in removed:
+                body_el.remove(el)
+                removed.add(idx)
+            continue
+        if "{" not in tmpl:
+            continue
+        if cell is not None:
+            el = el.tr_lst[cell[0]].tc_lst[cell[1]].p_lst[0]
+        el.r_lst[0].text = tmpl.format(**v)
+    return doc
+
+
+def render_docx(kind: str, layout, v: dict):
+    """Word-dokument ud fra layout + værdier (skabelon-kopi eller klassisk opbygning)"""
+    if DOCX_SKELETONS:
+        return _render_docx_skeleton(kind, layout, v)
+    return _render_docx_classic(layout, v)
+
+
+# ============================================================
+# AFSNIT 5a – RÅ OOXML-WRITER (hurtig vej til Word uden python-docx pr. dokument)
+# ============================================================
+# "docx" = python-docx (skabelon-kopi), "ooxml" = word/document.xml skrives direkte i zip'en
+DOCX_BACKEND = os.environ.get("BC_DOCX_BACKEND", "docx")
+
+_SLOT_RE = re.compile(r"<w:t>@@S(\d+)@@</w:t>|<!--@@IF (\w+)@@-->|<!--@@END@@-->")
+_XML_INVALID_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_ooxml_templates = {}
+_ooxml_templates_lock = threading.Lock()
+
+
+def _run_content_xml(text: str) -> str:
+    """
+    samme run-indhold som python-docx laver for run.text = text (w:t / w:tab / w:br).
+    Undtagelse: kontroltegn, som XML ikke tillader, fjernes her – python-docx fejler på dem i stedet.
+    """
+    out = []
+    buf = []
+
+    def flush():
+        if buf:
+            t = "".join(buf)
+            space = ' xml:space="preserve"' if len(t.strip()) < len(t) else ""
+            out.append(f"<w:t{space}>{xml_escape(t)}</w:t>")
+            buf.clear()
+
+    for ch in _XML_INVALID_RE.sub("", text):
+        if ch == "\t":
+            flush()
+            out.append("<w:tab/>")
+        elif ch in "\r\n":
+            flush()
+            out.append("<w:br/>")
+        else:
+            buf.append(ch)
+    flush()
+    return "".join(out)
+
+
+def _compile_ooxml(kind: str, layout):
+    """
+    Ud fra den kompilerede skabelon: alle øvrige pakke-dele som færdige bytes,
+    og word/document.xml splittet i faste XML-stykker og pladser til udfyldning.
+    """
+    from lxml import etree
+    with _skeletons_lock:
+        if kind not in _skeletons:
+            _skeletons[kind] = _compile_skeleton(layout)
+        skeleton, slots = _skeletons[kind]
+    doc = copy.deepcopy(skeleton)
+
+    body = list(doc.element.body)
+    templates = []
+    conds = {}
+    for idx, tmpl, cond, cell in slots:
+        if cond:
+            conds[idx] = cond
+        if "{" not in tmpl:
+            continue
+        el = body[idx]
+        if cell is not None:
+            el = el.tr_lst[cell[0]].tc_lst[cell[1]].p_lst[0]
+        el.r_lst[0].text = f"@@S{len(templates)}@@"
+        templates.append(tmpl)
+    for idx, cond in conds.items():
+        body[idx].addprevious(etree.Comment(f"@@IF {cond}@@"))
+        body[idx].addnext(etree.Comment("@@END@@"))
+
+    bio = io.BytesIO()
+    doc.save(bio)
+    parts = []
+    with zipfile.ZipFile(io.BytesIO(bio.getvalue())) as zf:
+        for info in zf.infolist():
+            parts.append((info.filename, zf.read(info.filename)))
+
+    xml = dict(parts)["word/document.xml"].decode("utf-8")
+    ops = []
+    pos = 0
+    for mt in _SLOT_RE.finditer(xml):
+        ops.append(("s", xml[pos:mt.start()]))
+        if mt.group(1) is not None:
+            ops.append(("slot", templates[int(mt.group(1))]))
+        elif mt.group(2) is not None:
+            ops.append(("if", mt.group(2)))
+        else:
+            ops.append(("end", None))
+        pos = mt.end()
+    ops.append(("s", xml[pos:]))
+    return parts, ops
+
+
+def _write_docx_ooxml(target, kind: str, layout, v: dict):
+    with _ooxml_templates_lock:
+        if kind not in _ooxml_templates:
+            _ooxml_templates[kind] = _compile_ooxml(kind, layout)
+        parts, ops = _ooxml_templates[kind]
+
+    with span("render"):
+        document_xml = _render_ooxml(ops, v)
+
+    with span("save"), zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts:
+            zf.writestr(name, document_xml if name == "word/document.xml" else data)
+
+
+def _render_ooxml(ops, v: dict) -> bytes:
+    out = []
+    skip = 0
+    for op, arg in ops:
+        if op == "if":
+            if skip or not v.get(arg):
+                skip += 1
+        elif op == "end":
+            if skip:
+                skip -= 1
+        elif skip:
+            continue
+        elif op == "s":
+            out.append(arg)
+        else:
+            out.append(_run_content_xml(str(arg.format(**v))))
+    return "".join(out).encode("utf-8")
+
+
+def write_docx(target, kind: str, layout, v: dict, backend: str = None):
+    """skriv et Word-dokument til target (sti eller fil-objekt) med den valgte backend"""
+    backend = backend or DOCX_BACKEND
+    if backend == "ooxml":
+        _write_docx_ooxml(target, kind, layout, v)
+    else:
+        with span("render"):
+            doc = render_docx(kind, layout, v)
+        with span("save"):
+            doc.save(target)
+
+
+def docx_text(source) -> list:
+    """al tekst i et .docx (afsnit og tabelceller i rækkefølge) – til at sammenligne backends"""
+    from docx import Document
+    doc = Document(source)
+    lines = []
+    for el in doc.element.body.iterchildren():
+        if el.tag == qn("w:p"):
+            lines.append("".join(t.text or "" for t in el.iter(qn("w:t"))))
+        elif el.tag == qn("w:tbl"):
+            for tc in el.iter(qn("w:tc")):
+                lines.append("".join(t.text or "" for t in tc.iter(qn("w:t"))))
+    return lines
+
+
+def check_ooxml_backend(c: dict = None) -> list:
+    """
+    Golden-sammenligning: byg begge Word-dokumenter med python-docx og med OOXML-writeren
+    og returnér de steder, hvor teksten afviger (tom liste = ens).
+    Mod en fast golden-fil: tests/test_ooxml_golden.py (tests/ooxml_golden.json).
+    """
+    c = c or empty_form()
+    m = calc_metrics(c)
+    sim = simulate_metrics(c)
+    diffs = []
+    for kind, layout, v in (
+        ("pdd", PDD_LAYOUT, pdd_values(c, m)),
+        ("ledelse", LEADERSHIP_LAYOUT, leadership_values(c, m, c.get("extra_json", ""), sim)),
+    ):
+        golden, fast = io.BytesIO(), io.BytesIO()
+        write_docx(golden, kind, layout, v, backend="docx")
+        write_docx(fast, kind, layout, v, backend="ooxml")
+        a, b = docx_text(golden), docx_text(fast)
+        if a != b:
+            for i in range(max(len(a), len(b))):
+                x = a[i] if i < len(a) else None
+                y = b[i] if i < len(b) else None
+                if x != y:
+                    diffs.append((kind, i, x, y))
+    return diffs
+
+
+# ============================================================
+# AFSNIT 5b – WORD PDD / RTS
+# ============================================================
+PDD_LAYOUT = [
+    ("heading", "PDD / RTS – {procesnavn}", 1),
 
     # Overblik
-    doc.add_heading("Overblik", level=2)
-    doc.add_paragraph(f"Område: {c.get('formaal','HR / IT / Forretning')}")
-    doc.add_paragraph(f"Procesejer: {c.get('proces_ejer','')}")
-    doc.add_paragraph(f"Sponsor: {c.get('sponsor','')}")
-    doc.add_paragraph(f"Udførende i dag: {c.get('udfoerende','')}")
-    doc.add_paragraph(f"Systemer: {c.get('systemer','')}")
+    ("heading", "Overblik", 2),
+    ("p", "Område: {formaal}"),
+    ("p", "Procesejer: {proces_ejer}"),
+    ("p", "Sponsor: {sponsor}"),
+    ("p", "Udførende i dag: {udfoerende}"),
+    ("p", "Systemer: {systemer}"),
 
     # Formål
-    doc.add_heading("Formål", level=2)
-    doc.add_paragraph(
-        "At dokumentere den nuværende (AS-IS) proces og beskrive den fremtidige (TO-BE) automatiserede proces, "
-        "så RPA-udvikleren kan bygge, og ledelsen kan godkende."
-    )
+    ("heading", "Formål", 2),
+    ("p",
+     "At dokumentere den nuværende (AS-IS) proces og beskrive den fremtidige (TO-BE) automatiserede proces, "
+     "så RPA-udvikleren kan bygge, og ledelsen kan godkende."),
 
     # Interessenter
-    doc.add_heading("Interessenter", level=2)
-    doc.add_paragraph(f"- Procesejer / godkender: {c.get('proces_ejer','')}")
-    doc.add_paragraph(f"- SME / procesekspert: {c.get('sme','')}")
-    doc.add_paragraph(f"- RPA-udvikler: {c.get('rpa_udvikler','')}")
-    doc.add_paragraph(f"- Sponsor / ledelse: {c.get('sponsor','')}")
-
-    # AS-IS
-    doc.add_heading("AS-IS proces", level=2)
-    doc.add_paragraph(c.get("as_is_beskrivelse", "Manuel proces med flere aktører."))
-
-    # TO-BE
-    doc.add_heading("TO-BE proces (RPA / PAD)", level=2)
-    doc.add_paragraph(
-        c.get("to_be_beskrivelse", "Proces automatiseres, robotten henter input, opretter i systemer og logger resultat.")
-    )
+    ("heading", "Interessenter", 2),
+    ("p", "- Procesejer / godkender: {proces_ejer}"),
+    ("p", "- SME / procesekspert: {sme}"),
+    ("p", "- RPA-udvikler: {rpa_udvikler}"),
+    ("p", "- Sponsor / ledelse: {sponsor}"),
+
+    # AS-IS / TO-BE
+    ("heading", "AS-IS proces", 2),
+    ("p", "{as_is_beskrivelse}"),
+    ("heading", "TO-BE proces (RPA / PAD)", 2),
+    ("p", "{to_be_beskrivelse}"),
 
     # Input / Output / Fejl
-    doc.add_heading("Input", level=3)
-    doc.add_paragraph(c.get("input", ""))
-    doc.add_heading("Output", level=3)
-    doc.add_paragraph(c.get("output", ""))
-    doc.add_heading("Fejl / undtagelser", level=3)
-    doc.add_paragraph(c.get("fejl", ""))
+    ("heading", "Input", 3),
+    ("p", "{input}"),
+    ("heading", "Output", 3),
+    ("p", "{output}"),
+    ("heading", "Fejl / undtagelser", 3),
+    ("p", "{fejl}"),
 
     # Økonomi
-    doc.add_heading("Økonomi (nøgletal)", level=2)
-    doc.add_paragraph(f"Årligt tidsforbrug før automation: {fmt_num(m['timer_pr_aar'], 1)} timer")
-    doc.add_paragraph(f"Årlig besparelse: {fmt_dkk(m['aarlig_besparelse'], 0)}")
-    doc.add_paragraph(f"Investering: {fmt_dkk(c.get('investering_kr'), 0)}")
-    doc.add_paragraph(f"Break-even: {fmt_num(m['break_even_aar'], 1)} år")
+    ("heading", "Økonomi (nøgletal)", 2),
+    ("p", "Årligt tidsforbrug før automation: {timer_pr_aar} timer"),
+    ("p", "Årlig besparelse: {aarlig_besparelse}"),
+    ("p", "Investering: {investering}"),
+    ("p", "Break-even: {break_even} år"),
+]
 
-    # lidt større skrift
-    for para in doc.paragraphs:
-        for run in para.runs:
-            run.font.size = Pt(11)
 
-    doc.save(path)
+def pdd_values(c: dict, m: dict) -> dict:
+    return {
+        "procesnavn": c.get("procesnavn", "Proces"),
+        "formaal": c.get("formaal", "HR / IT / Forretning"),
+        "proces_ejer": c.get("proces_ejer", ""),
+        "sponsor": c.get("sponsor", ""),
+        "udfoerende": c.get("udfoerende", ""),
+        "systemer": c.get("systemer", ""),
+        "sme": c.get("sme", ""),
+        "rpa_udvikler": c.get("rpa_udvikler", ""),
+        "as_is_beskrivelse": c.get("as_is_beskrivelse", "Manuel proces med flere aktører."),
+        "to_be_beskrivelse": c.get(
+            "to_be_beskrivelse",
+            "Proces automatiseres, robotten henter input, opretter i systemer og logger resultat.",
+        ),
+        "input": c.get("input", ""),
+        "output": c.get("output", ""),
+        "fejl": c.get("fejl", ""),
+        "timer_pr_aar": fmt_num(m["timer_pr_aar"], 1),
+        "aarlig_besparelse": fmt_dkk(m["aarlig_besparelse"], 0),
+        "investering": fmt_dkk(c.get("investering_kr"), 0),
+        "break_even": fmt_num(m["break_even_aar"], 1),
+    }
+
+
+def build_word_pdd(path: str, c: dict, m: dict, backend: str = None):
+    write_docx(path, "pdd", PDD_LAYOUT, pdd_values(c, m), backend)
 
 
 # ============================================================
 # AFSNIT 6 – WORD LEDELSESBESKRIVELSE
 # ============================================================
-def build_word_leadership(path: str, c: dict, m: dict, extra_json_text: str = ""):
-    doc = Document()
-
-    # logo i header
-    add_logo_header(doc)
-
-    # Titel
-    title = doc.add_heading(f"Ledelsesbeskrivelse – {c.get('procesnavn','Proces')}", level=1)
-    title.alignment = WD_ALIGN_PARAGRAPH.LEFT
-
-    intro = doc.add_paragraph(
-        "Formålet med dette dokument er at give ledelsen et klart beslutningsgrundlag for at automatisere processen."
-    )
-    intro.runs[0].font.size = Pt(11)
+LEADERSHIP_LAYOUT = [
+    ("title", "Ledelsesbeskrivelse – {procesnavn}", 1),
+    ("p", "Formålet med dette dokument er at give ledelsen et klart beslutningsgrundlag for at automatisere processen."),
 
     # Executive summary som tabel
-    doc.add_paragraph("")
-    doc.add_paragraph("Executive summary:").runs[0].bold = True
-
-    table = doc.add_table(rows=0, cols=2)
-    rows = [
-        ("Problem / nuværende situation", c.get("formaal", "Manuel proces med spildtid og fejl.")),
-        ("Løsning", f"Automatiseret RPA/PAD-flow i {c.get('systemer','relevante systemer')}"),
-        ("Tidsforbrug før", f"{c.get('varighed_min','?')} min × {c.get('frekvens_pr_uge','?')} pr. uge"),
-        ("Automationsgrad", f"{c.get('automationsgrad_pct','80')} %"),
-        ("Årlig besparelse", fmt_dkk(m["aarlig_besparelse"], 0)),
-        ("Investering", fmt_dkk(c.get("investering_kr"), 0)),
-        ("Break-even", f"{fmt_num(m['break_even_aar'], 1)} år"),
-        ("Kvalitative gevinster", c.get("kvalitative", "Færre fejl, hurtigere levering, bedre service")),
-    ]
-    for label, value in rows:
-        row = table.add_row().cells
-        row[0].text = label
-        row[1].text = str(value)
+    ("p", ""),
+    ("bold", "Executive summary:"),
+    ("table", [
+        ("Problem / nuværende situation", "{problem}"),
+        ("Løsning", "Automatiseret RPA/PAD-flow i {systemer}"),
+        ("Tidsforbrug før", "{varighed_min} min × {frekvens_pr_uge} pr. uge"),
+        ("Automationsgrad", "{automationsgrad_pct} %"),
+        ("Årlig besparelse", "{aarlig_besparelse}"),
+        ("Investering", "{investering}"),
+        ("Break-even", "{break_even} år"),
+        ("Kvalitative gevinster", "{kvalitative_kort}"),
+    ]),
 
     # 1. Baggrund
-    doc.add_heading("1. Baggrund og formål", level=2)
-    doc.add_paragraph(
-        "Processen udføres i dag manuelt af én eller flere roller. Det giver risiko for manglende data, dobbeltindtastning og ventetid. "
-        "Automatiseringen skal standardisere opgaven og frigive tid til andre opgaver."
-    )
+    ("heading", "1. Baggrund og formål", 2),
+    ("p",
+     "Processen udføres i dag manuelt af én eller flere roller. Det giver risiko for manglende data, dobbeltindtastning og ventetid. "
+     "Automatiseringen skal standardisere opgaven og frigive tid til andre opgaver."),
 
     # 2. AS-IS / TO-BE
-    doc.add_heading("2. Procesbeskrivelse (AS-IS → TO-BE)", level=2)
-    doc.add_paragraph("AS-IS:").runs[0].bold = True
-    doc.add_paragraph(c.get("as_is_beskrivelse", "Manuel proces uden standardisering."))
-    doc.add_paragraph("TO-BE:").runs[0].bold = True
-    doc.add_paragraph(c.get("to_be_beskrivelse", "Proces køres som RPA-flow/PAD med faste input og logning."))
+    ("heading", "2. Procesbeskrivelse (AS-IS → TO-BE)", 2),
+    ("bold", "AS-IS:"),
+    ("p", "{as_is_beskrivelse}"),
+    ("bold", "TO-BE:"),
+    ("p", "{to_be_beskrivelse}"),
 
     # 3. Økonomi
-    doc.add_heading("3. Økonomi", level=2)
-    doc.add_paragraph(f"Årligt tidsforbrug før automation: {fmt_num(m['timer_pr_aar'], 1)} timer.")
-    doc.add_paragraph(f"Årlig omkostning før: {fmt_dkk(m['omkostning_foer'], 0)}.")
-    doc.add_paragraph(f"Årlig omkostning efter: {fmt_dkk(m['omkostning_efter'], 0)}.")
-    doc.add_paragraph(f"Forventet årlig besparelse: {fmt_dkk(m['aarlig_besparelse'], 0)}.")
-    doc.add_paragraph(f"Investering: {fmt_dkk(c.get('investering_kr'), 0)}.")
-    doc.add_paragraph(f"Break-even: {fmt_num(m['break_even_aar'], 1)} år.")
+    ("heading", "3. Økonomi", 2),
+    ("p", "Årligt tidsforbrug før automation: {timer_pr_aar} timer."),
+    ("p", "Årlig omkostning før: {omkostning_foer}."),
+    ("p", "Årlig omkostning efter: {omkostning_efter}."),
+    ("p", "Forventet årlig besparelse: {aarlig_besparelse}."),
+    ("p", "Investering: {investering}."),
+    ("p", "Break-even: {break_even} år."),
+    ("if", "sim", [
+        ("p",
+         "Usikkerhed ({sim_samples} simuleringer): årlig besparelse "
+         "P10 {sim_besp_p10} / P50 {sim_besp_p50} / P90 {sim_besp_p90}."),
+        ("p",
+         "Break-even P10 {sim_be_p10} / P50 {sim_be_p50} / P90 {sim_be_p90}. "
+         "Sandsynlighed for positiv besparelse: {sim_andel_positiv} %."),
+    ]),
 
     # 4. Roller
-    doc.add_heading("4. Roller og ansvar", level=2)
-    doc.add_paragraph(f"Procesejer: {c.get('proces_ejer','')}")
-    doc.add_paragraph(f"Sponsor: {c.get('sponsor','')}")
-    doc.add_paragraph(f"SME / procesekspert: {c.get('sme','')}")
-    doc.add_paragraph(f"RPA-udvikler: {c.get('rpa_udvikler','')}")
+    ("heading", "4. Roller og ansvar", 2),
+    ("p", "Procesejer: {proces_ejer}"),
+    ("p", "Sponsor: {sponsor}"),
+    ("p", "SME / procesekspert: {sme}"),
+    ("p", "RPA-udvikler: {rpa_udvikler}"),
 
     # 5. Gevinster
-    doc.add_heading("5. Gevinster (kvalitative)", level=2)
-    doc.add_paragraph(
-        c.get(
-            "kvalitative",
-            "Hurtigere levering, færre fejl, bedre datakvalitet, tilfredse medarbejdere."
-        )
-    )
+    ("heading", "5. Gevinster (kvalitative)", 2),
+    ("p", "{kvalitative}"),
 
     # 6. Risiko
-    doc.add_heading("6. Risiko og afhængigheder", level=2)
-    doc.add_paragraph(c.get("afhaengigheder", "Afhænger af adgang til HR-/fagsystemer og licenser."))
+    ("heading", "6. Risiko og afhængigheder", 2),
+    ("p", "{afhaengigheder}"),
 
     # 7. Konklusion
-    doc.add_heading("7. Konklusion og anbefaling", level=2)
-    doc.add_paragraph(
-        "Automatiseringen kan gennemføres med lav til middel risiko og med tydelig økonomisk effekt. "
-        "Det anbefales, at ledelsen godkender projektet og igangsætter udviklingen."
-    )
-
-    if extra_json_text:
-        doc.add_heading("Bilag – rådata fra formular/upload", level=2)
-        doc.add_paragraph(extra_json_text)
-
-    for para in doc.paragraphs:
-        for run in para.runs:
-            run.font.size = Pt(11)
-
-    doc.save(path)
+    ("heading", "7. Konklusion og anbefaling", 2),
+    ("p",
+     "Automatiseringen kan gennemføres med lav til middel risiko og med tydelig økonomisk effekt. "
+     "Det anbefales, at ledelsen godkender projektet og igangsætter udviklingen."),
+
+    ("if", "extra_json", [
+        ("heading", "Bilag – rådata fra formular/upload", 2),
+        ("p", "{extra_json}"),
+    ]),
+]
+
+
+def leadership_values(c: dict, m: dict, extra_json_text: str = "", sim: dict = None) -> dict:
+    v = {
+        "procesnavn": c.get("procesnavn", "Proces"),
+        "problem": c.get("formaal", "Manuel proces med spildtid og fejl."),
+        "systemer": c.get("systemer", "relevante systemer"),
+        "varighed_min": c.get("varighed_min", "?"),
+        "frekvens_pr_uge": c.get("frekvens_pr_uge", "?"),
+        "automationsgrad_pct": c.get("automationsgrad_pct", "80"),
+        "kvalitative_kort": c.get("kvalitative", "Færre fejl, hurtigere levering, bedre service"),
+        "as_is_beskrivelse": c.get("as_is_beskrivelse", "Manuel proces uden standardisering."),
+        "to_be_beskrivelse": c.get("to_be_beskrivelse", "Proces køres som RPA-flow/PAD med faste input og logning."),
+        "timer_pr_aar": fmt_num(m["timer_pr_aar"], 1),
+        "omkostning_foer": fmt_dkk(m["omkostning_foer"], 0),
+        "omkostning_efter": fmt_dkk(m["omkostning_efter"], 0),
+        "aarlig_besparelse": fmt_dkk(m["aarlig_besparelse"], 0),
+        "investering": fmt_dkk(c.get("investering_kr"), 0),
+        "break_even": fmt_num(m["break_even_aar"], 1),
+        "proces_ejer": c.get("proces_ejer", ""),
+        "sponsor": c.get("sponsor", ""),
+        "sme": c.get("sme", ""),
+        "rpa_udvikler": c.get("rpa_udvikler", ""),
+        "kvalitative": c.get(
+            "kvalitative",
+            "Hurtigere levering, færre fejl, bedre datakvalitet, tilfredse medarbejdere."
+        ),
+        "afhaengigheder": c.get("afhaengigheder", "Afhænger af adgang til HR-/fagsystemer og licenser."),
+        "extra_json": extra_json_text,
+        "sim": bool(sim),
+    }
+    if sim:
+        sb, se = sim["aarlig_besparelse"], sim["break_even_aar"]
+        v.update({
+            "sim_samples": fmt_num(sim["samples"], 0),
+            "sim_besp_p10": fmt_dkk(sb["p10"], 0),
+            "sim_besp_p50": fmt_dkk(sb["p50"], 0),
+            "sim_besp_p90": fmt_dkk(sb["p90"], 0),
+            "sim_be_p10": fmt_years(se["p10"]),
+            "sim_be_p50": fmt_years(se["p50"]),
+            "sim_be_p90": fmt_years(se["p90"]),
+            "sim_andel_positiv": fmt_num(sim["andel_positiv"] * 100, 0),
+        })
+    return v
+
+
+def build_word_leadership(path: str, c: dict, m: dict, extra_json_text: str = "", sim: dict = None,
+                          backend: str = None):
+    write_docx(path, "ledelse", LEADERSHIP_LAYOUT, leadership_values(c, m, extra_json_text, sim), backend)
 
 
 # ============================================================
 # AFSNIT 7 – EXCEL
 # ============================================================
-YELLOW = PatternFill("solid", fgColor="FFF2CC")
-GREY = PatternFill("solid", fgColor="F2F2F2")
+def excel_fills() -> tuple:
+    """(gul, grå) udfyldning til input- og overskriftsceller"""
+    from openpyxl.styles import PatternFill
+    return PatternFill("solid", fgColor="FFF2CC"), PatternFill("solid", fgColor="F2F2F2")
 
-def build_excel(path: str, c: dict, m: dict):
-    from openpyxl.drawing.image import Image as XLImage
 
+def build_excel(path: str, c: dict, m: dict, sim: dict = None):
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment
+    YELLOW, GREY = excel_fills()
     wb = Workbook()
     ws = wb.active
     ws.title = "Forside"
@@ -513,15 +1796,13 @@ def build_excel(path: str, c: dict, m: dict):
     ws["B6"] = datetime.now().strftime("%d-%m-%Y")
 
     # logo i excel hvis muligt
-    logo_path = get_logo_path_for_docs()
-    if logo_path and os.path.exists(logo_path):
-        try:
-            img = XLImage(logo_path)
-            img.height = 90
-            img.width = 180
-            ws.add_image(img, "D1")
-        except Exception:
-            pass
+    with span("logo"):
+        assets = get_logo_assets()
+        if assets:
+            try:
+                ws.add_image(_cached_xl_image_class()(assets["xlsx"], *LOGO_XLSX_SIZE), "D1")
+            except Exception:
+                pass
 
     # Spørgsmål
     ws2 = wb.create_sheet("Spørgsmål")
@@ -535,63 +1816,1360 @@ def build_excel(path: str, c: dict, m: dict):
     ws2.column_dimensions["A"].width = 35
     ws2.column_dimensions["B"].width = 80
 
-    # PDD
-    ws3 = wb.create_sheet("PDD (AS-IS)")
-    ws3["A1"] = "AS-IS beskrivelse"
-    ws3["A2"] = c.get("as_is_beskrivelse", "")
-    ws3["A2"].alignment = Alignment(wrap_text=True)
+    # PDD
+    ws3 = wb.create_sheet("PDD (AS-IS)")
+    ws3["A1"] = "AS-IS beskrivelse"
+    ws3["A2"] = c.get("as_is_beskrivelse", "")
+    ws3["A2"].alignment = Alignment(wrap_text=True)
+
+    # RTS
+    ws4 = wb.create_sheet("RTS (TO-BE)")
+    ws4["A1"] = "TO-BE beskrivelse"
+    ws4["A2"] = c.get("to_be_beskrivelse", "")
+    ws4["A2"].alignment = Alignment(wrap_text=True)
+
+    # Økonomi
+    ws5 = wb.create_sheet("Økonomi")
+    ws5["A1"] = "Parameter"
+    ws5["B1"] = "Værdi"
+    ws5["A2"] = "Minutter pr. år"
+    ws5["B2"] = m["minutter_pr_aar"]
+    ws5["A3"] = "Timer pr. år"
+    ws5["B3"] = m["timer_pr_aar"]
+    ws5["A4"] = "Årlig omkostning før"
+    ws5["B4"] = m["omkostning_foer"]
+    ws5["A5"] = "Årlig omkostning efter"
+    ws5["B5"] = m["omkostning_efter"]
+    ws5["A6"] = "Årlig besparelse"
+    ws5["B6"] = m["aarlig_besparelse"]
+    ws5["A7"] = "Investering"
+    ws5["B7"] = to_number(c.get("investering_kr"), 0.0)
+    ws5["A8"] = "Break-even (år)"
+    ws5["B8"] = m["break_even_aar"]
+
+    if sim:
+        ws5["A10"] = f"Usikkerhed (Monte Carlo, {sim['samples']} simuleringer)"
+        ws5["A10"].font = Font(bold=True)
+        ws5["A11"] = "Parameter"
+        ws5["B11"] = "P10"
+        ws5["C11"] = "P50"
+        ws5["D11"] = "P90"
+        ws5["A12"] = "Årlig besparelse"
+        ws5["A13"] = "Break-even (år)"
+        for col, p in (("B", "p10"), ("C", "p50"), ("D", "p90")):
+            ws5[f"{col}12"] = sim["aarlig_besparelse"][p]
+            be = sim["break_even_aar"][p]
+            ws5[f"{col}13"] = be if be != float("inf") else "tjenes ikke hjem"
+        ws5["A14"] = "Sandsynlighed for positiv besparelse"
+        ws5["B14"] = sim["andel_positiv"]
+        ws5["B14"].number_format = "0%"
+        ws5.column_dimensions["A"].width = 38
+
+    # Business Case
+    ws6 = wb.create_sheet("Business Case")
+    ws6["A1"] = "Business Case – samlet vurdering"
+    ws6["A3"] = "Anbefaling"
+    ws6["B3"] = "Automatisering anbefales – lav risiko, hurtig gevinst."
+    ws6["A5"] = "Kvalitative gevinster"
+    ws6["B5"] = c.get("kvalitative", "")
+
+    # Ledelse – kort overblik
+    ws7 = wb.create_sheet("Ledelse")
+    ws7["A1"] = "Ledelsesoverblik"
+    ws7["A1"].font = Font(size=14, bold=True)
+    ws7["A3"] = "Procesnavn"
+    ws7["B3"] = c.get("procesnavn", "")
+    ws7["A4"] = "Årlig besparelse"
+    ws7["B4"] = m["aarlig_besparelse"]
+    ws7["A5"] = "Investering"
+    ws7["B5"] = to_number(c.get("investering_kr"), 0.0)
+    ws7["A6"] = "Break-even (år)"
+    ws7["B6"] = m["break_even_aar"]
+    ws7["A8"] = "Anbefaling"
+    ws7["B8"] = "Automatisering anbefales – lav risiko, tydelig effekt."
+    ws7.column_dimensions["A"].width = 28
+    ws7.column_dimensions["B"].width = 50
+
+    with span("save"):
+        wb.save(path)
+
+
+# ============================================================
+# AFSNIT 7a – ARTEFAKT-CACHE (samme formular -> samme filer)
+# ============================================================
+def form_cache_key(c: dict, variant: str = "") -> str:
+    """stabil hash af den normaliserede formular + app-version (+ leveringsform)"""
+    canonical = json.dumps(normalize_form(c), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    h = hashlib.sha256()
+    h.update(f"{APP_VERSION}|{variant}|".encode("utf-8"))
+    h.update(canonical.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _generate_variant(outdir: str, in_memory: bool, keep_copy: bool, docx_backend: str = None) -> str:
+    """leveringsform + Word-backend – python-docx og OOXML giver ikke de samme filer"""
+    backend = docx_backend or DOCX_BACKEND
+    if in_memory:
+        return f"memory|{outdir}|{backend}" if keep_copy else f"memory|{backend}"
+    return f"disk|{outdir}|{backend}"
+
+
+# hvilke felter og nøgletal hvert artefakt bygger på – ændres intet af dem, genbruges artefaktet
+# ("*" = alle formularfelter; Excel-arket "Spørgsmål" viser dem alle)
+ARTIFACT_DEPENDENCIES = {
+    "excel": {
+        "fields": "*",
+        "metrics": ["minutter_pr_aar", "timer_pr_aar", "omkostning_foer", "omkostning_efter",
+                    "aarlig_besparelse", "break_even_aar"],
+        "simulation": True,
+    },
+    "pdd": {
+        "fields": ["procesnavn", "formaal", "proces_ejer", "sponsor", "udfoerende", "systemer", "sme",
+                   "rpa_udvikler", "as_is_beskrivelse", "to_be_beskrivelse", "input", "output", "fejl",
+                   "investering_kr"],
+        "metrics": ["timer_pr_aar", "aarlig_besparelse", "break_even_aar"],
+        "simulation": False,
+    },
+    "ledelse": {
+        "fields": ["procesnavn", "formaal", "systemer", "varighed_min", "frekvens_pr_uge",
+                   "automationsgrad_pct", "kvalitative", "as_is_beskrivelse", "to_be_beskrivelse",
+                   "investering_kr", "proces_ejer", "sponsor", "sme", "rpa_udvikler", "afhaengigheder",
+                   "extra_json"],
+        "metrics": ["timer_pr_aar", "omkostning_foer", "omkostning_efter", "aarlig_besparelse",
+                    "break_even_aar"],
+        "simulation": True,
+    },
+}
+
+
+def artifact_key(kind: str, c: dict, m: dict, sim: dict, variant: str = "") -> str:
+    """hash af præcis de input ét artefakt afhænger af"""
+    deps = ARTIFACT_DEPENDENCIES[kind]
+    fields = sorted(c) if deps["fields"] == "*" else deps["fields"]
+    payload = {
+        "fields": {k: c.get(k) for k in fields},
+        "metrics": {k: m[k] for k in deps["metrics"]},
+        "simulation": sim if deps["simulation"] else None,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    h = hashlib.sha256()
+    h.update(f"{APP_VERSION}|{kind}|{variant}|".encode("utf-8"))
+    h.update(canonical.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _result_size(result: dict) -> int:
+    return sum(buf.getbuffer().nbytes for buf in (result.get("buffers") or {}).values())
+
+
+class ArtifactCache:
+    """
+    LRU over færdige build_case-resultater, begrænset af antal, samlet buffer-størrelse og alder.
+    Resultater på disk tjekkes ved opslag – er en fil slettet, tæller det som miss.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_MB * 1024 * 1024,
+                 max_age: int = CACHE_MAX_AGE_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()  # key -> (tidspunkt, størrelse, resultat)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop_locked(self, key):
+        _ts, size, _result = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                ts, _size, result = entry
+                files_ok = all(os.path.exists(p) for p in result["files"].values())
+                if time.time() - ts <= self.max_age and files_ok:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                self._drop_locked(key)
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: dict):
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop_locked(key)
+            self._entries[key] = (time.time(), size, result)
+            self._bytes += size
+            now = time.time()
+            while self._entries:
+                oldest_key, (ts, _size, _result) = next(iter(self._entries.items()))
+                if (len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+                        or now - ts > self.max_age):
+                    self._drop_locked(oldest_key)
+                    self.evictions += 1
+                else:
+                    break
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "max_age_s": self.max_age,
+            }
+
+
+artifact_cache = ArtifactCache()        # hele cases
+artifact_piece_cache = ArtifactCache()  # enkelte artefakter (Excel / PDD / ledelse)
+
+
+# ============================================================
+# AFSNIT 7b – GENERERING (én case + batch)
+# ============================================================
+def _input_number(val):
+    """værdi fra et <input type=number>: browseren sender altid "." som decimaltegn, aldrig tusindtal"""
+    try:
+        x = float(val)
+    except (TypeError, ValueError):
+        return val
+    return int(x) if x.is_integer() else x
+
+
+def normalize_form(data, number_inputs: bool = False) -> dict:
+    """
+    lav et vilkårligt dict/request.form om til en komplet formular (kun kendte felter).
+    Tal i talfelterne beholdes som tal (JSON 1.125 må ikke blive teksten "1.125" = 1125), resten bliver tekst.
+    number_inputs=True: talfelterne kommer fra browserens <input type=number> og læses med "." som decimaltegn.
+    """
+    c = empty_form()
+    if not data:
+        return c
+    for key in c.keys():
+        if key in data and not isinstance(data[key], (dict, list)):
+            val = data[key]
+            if key in NUMERIC_FIELDS and isinstance(val, (int, float)) and not isinstance(val, bool):
+                c[key] = val
+                continue
+            c[key] = "" if val is None else str(val).strip()
+            if number_inputs and key in NUMERIC_FIELDS and c[key]:
+                c[key] = _input_number(c[key])
+    return c
+
+
+def json_safe(obj):
+    """JSON kender ikke Infinity/NaN – ikke-endelige tal (fx break-even der aldrig nås) bliver null"""
+    if isinstance(obj, float) and (obj != obj or obj in (float("inf"), float("-inf"))):
+        return None
+    if isinstance(obj, dict):
+        return {k: json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [json_safe(v) for v in obj]
+    return obj
+
+
+def artifact_names(c: dict, stamp: str) -> dict:
+    base = safe_name(c.get("procesnavn") or "RPA_BusinessCase")
+    return {
+        "excel": f"{base}_BC_{stamp}.xlsx",
+        "pdd": f"{base}_PDD_RTS_{stamp}.docx",
+        "ledelse": f"{base}_Ledelsesbeskrivelse_{stamp}.docx",
+    }
+
+
+def reserve_path(outdir: str, name: str) -> str:
+    """
+    Reserverer et ledigt filnavn i outdir (opretter filen tom, atomisk).
+    Findes navnet allerede, får det _2, _3 … – så en tidligere (evt. cachet) fil aldrig overskrives.
+    """
+    root, ext = os.path.splitext(name)
+    n = 1
+    while True:
+        candidate = name if n == 1 else f"{root}_{n}{ext}"
+        path = os.path.join(outdir, candidate)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            n += 1
+            continue
+        os.close(fd)
+        return path
+
+
+# rækkefølge og fremskridt (procent) for de tre artefakter
+ARTIFACT_STEPS = [
+    ("excel", "Excel", 20),
+    ("pdd", "PDD / RTS", 50),
+    ("ledelse", "ledelsesbeskrivelse", 75),
+]
+
+
+def _build_artifact(kind: str, target, c: dict, m: dict, sim: dict, docx_backend: str = None):
+    if kind == "excel":
+        build_excel(target, c, m, sim=sim)
+    elif kind == "pdd":
+        build_word_pdd(target, c, m, backend=docx_backend)
+    else:
+        build_word_leadership(
+            target, c, m, extra_json_text=c.get("extra_json", ""), sim=sim, backend=docx_backend
+        )
+
+
+def _build_piece(kind: str, name: str, c: dict, m: dict, sim: dict, outdir: str, docx_backend: str,
+                 in_memory: bool, keep_copy: bool) -> tuple:
+    """bygger ét artefakt (også i en anden tråd/proces) -> (piece, sekunder, spans)"""
+    with collect_spans() as spans:
+        piece, seconds = _build_piece_timed(kind, name, c, m, sim, outdir, docx_backend, in_memory, keep_copy)
+    # fx "pdd", "pdd_render", "pdd_logo", "pdd_save"
+    return piece, seconds, [(kind, seconds)] + [(f"{kind}_{phase}", dt) for phase, dt in spans]
+
+
+def _build_piece_timed(kind: str, name: str, c: dict, m: dict, sim: dict, outdir: str, docx_backend: str,
+                       in_memory: bool, keep_copy: bool) -> tuple:
+    t0 = time.perf_counter()
+    piece = {"names": {kind: name}, "files": {}}
+    if in_memory:
+        buf = io.BytesIO()
+        _build_artifact(kind, buf, c, m, sim, docx_backend)
+        piece["buffers"] = {kind: buf}
+        if keep_copy:
+            path = reserve_path(outdir, name)
+            with span("copy"), open(path, "wb") as fh:
+                fh.write(buf.getbuffer())
+            piece["files"][kind] = path
+    else:
+        path = reserve_path(outdir, name)
+        piece["names"][kind] = os.path.basename(path)
+        try:
+            _build_artifact(kind, path, c, m, sim, docx_backend)
+        except Exception:
+            # ingen halve/tomme filer i output-mappen
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+        piece["files"][kind] = path
+    return piece, round(time.perf_counter() - t0, 4)
+
+
+_artifact_pool = None
+_artifact_pool_pid = None
+_artifact_pool_lock = threading.Lock()
+
+
+def get_artifact_pool() -> ThreadPoolExecutor:
+    """trådpulje til artefakterne – én pr. proces (en worker-proces kan ikke bruge forælderens tråde)"""
+    global _artifact_pool, _artifact_pool_pid
+    with _artifact_pool_lock:
+        if _artifact_pool is None or _artifact_pool_pid != os.getpid():
+            _artifact_pool = ThreadPoolExecutor(max_workers=len(ARTIFACT_STEPS), thread_name_prefix="bc-artifact")
+            _artifact_pool_pid = os.getpid()
+        return _artifact_pool
+
+
+def build_case(c: dict, outdir: str = None, stamp: str = None, progress=None, docx_backend: str = None,
+               in_memory: bool = False, keep_copy: bool = False, reuse: bool = True,
+               parallel: str = None) -> dict:
+    """
+    Bygger Excel + PDD + Ledelsesbeskrivelse for én case.
+    Returnerer et manifest med filstier, nøgletal og tid pr. artefakt (timings).
+    manifest["spans"] er [(fase, sekunder)] – modtageren lægger dem i /metrics (observe_spans).
+    progress: valgfri callback(trin, procent) – bruges af baggrundsjobs.
+    docx_backend: "docx" eller "ooxml" (default DOCX_BACKEND).
+    in_memory: byg i BytesIO-buffere (manifest["buffers"]) – intet på disk, medmindre keep_copy.
+    reuse: genbrug artefakter, hvis de felter/nøgletal de afhænger af er uændrede (ARTIFACT_DEPENDENCIES).
+    parallel: "off", "thread" eller "process" (default ARTIFACT_PARALLEL).
+    """
+    t_start = time.perf_counter()
+
+    def step(name, pct):
+        if progress:
+            progress(name, pct)
+
+    parallel = parallel or ARTIFACT_PARALLEL
+    if parallel == "process" and multiprocessing.parent_process() is not None:
+        parallel = "thread"  # vi er selv en worker-proces
+
+    step("Beregner nøgletal", 5)
+    with collect_spans() as spans:
+        with span("calc_metrics"):
+            m = calc_metrics(c)
+        with span("simulate"):
+            sim = simulate_metrics(c)
+
+    if not in_memory or keep_copy:
+        outdir = outdir or ensure_output_dir()
+    variant = _generate_variant(outdir, in_memory, keep_copy, docx_backend)
+    stamp = stamp or datetime.now().strftime("%Y%m%d_%H%M")
+    names = artifact_names(c, stamp)
+
+    result = {
+        "procesnavn": c.get("procesnavn", ""),
+        "metrics": m,
+        "simulation": sim,
+        "names": {},
+        "files": {},
+        "rebuilt": [],
+        "reused": [],
+        "timings": {},
+        "spans": spans,
+    }
+    if in_memory:
+        result["buffers"] = {}
+
+    pieces = {}
+    todo = []
+    for kind, label, pct in ARTIFACT_STEPS:
+        key = artifact_key(kind, c, m, sim, variant) if reuse else None
+        piece = artifact_piece_cache.get(key) if key else None
+        if piece is not None:
+            step(f"Genbruger {label}", pct)
+            result["reused"].append(kind)
+            pieces[kind] = piece
+        else:
+            todo.append((kind, label, pct, key))
+
+    def piece_args(kind):
+        return kind, names[kind], c, m, sim, outdir, docx_backend, in_memory, keep_copy
+
+    built = {}
+    error = None
+    if parallel == "off" or len(todo) < 2:
+        for kind, label, pct, key in todo:
+            step(f"Bygger {label}", pct)
+            try:
+                built[kind] = _build_piece(*piece_args(kind))
+            except Exception as e:
+                error = e
+                break
+    else:
+        pool = get_batch_pool() if parallel == "process" else get_artifact_pool()
+        step("Bygger " + ", ".join(label for _kind, label, _pct, _key in todo), 20)
+        futures = {pool.submit(_build_piece, *piece_args(kind)): (kind, label) for kind, label, _pct, _key in todo}
+        for fut in as_completed(futures):
+            kind, label = futures[fut]
+            try:
+                built[kind] = fut.result()
+            except Exception as e:
+                error = error or e
+                continue
+            step(f"{label} klar", 20 + 75 * len(built) // len(todo))
+
+    if error is not None:
+        # fejler ét artefakt, fjernes de andre fra dette kald også – ingen halve cases i output-mappen
+        for piece, _seconds, _spans in built.values():
+            for path in piece["files"].values():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        raise error
+
+    for kind, _label, _pct, key in todo:
+        piece, seconds, piece_spans = built[kind]
+        spans.extend(piece_spans)
+        if key:
+            artifact_piece_cache.put(key, piece)
+        result["rebuilt"].append(kind)
+        result["timings"][kind] = seconds
+        pieces[kind] = piece
+
+    for kind, _label, _pct in ARTIFACT_STEPS:
+        piece = pieces[kind]
+        result["names"][kind] = piece["names"][kind]
+        result["files"].update(piece["files"])
+        if in_memory:
+            result["buffers"][kind] = piece["buffers"][kind]
+
+    result["timings"]["total"] = round(time.perf_counter() - t_start, 4)
+    spans.append(("build_case", time.perf_counter() - t_start))
+    step("Færdig", 100)
+    return result
+
+
+class _ChunkSink(io.RawIOBase):
+    """ikke-søgbar fil, som ZipFile skriver i – det skrevne hentes løbende ud med pop()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def content_disposition(filename: str) -> str:
+    """
+    Content-Disposition for en download: filnavnet citeres, og navne med æ/ø/å (procesnavnet indgår)
+    får en ASCII-udgave plus filename* efter RFC 5987 – samme opskrift som werkzeug's send_file.
+    """
+    try:
+        filename.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+        quoted = quote(filename, safe="!#$&+^`|~")
+        return dump_options_header("attachment", {"filename": simple, "filename*": f"UTF-8''{quoted}"})
+    return dump_options_header("attachment", {"filename": filename})
+
+
+def stream_zip(entries, chunk_size: int = 64 * 1024):
+    """
+    Generator der giver en ZIP bid for bid ud fra [(filnavn, BytesIO)].
+    Bufferne læses via memoryview, så der aldrig ligger en ekstra fuld kopi i hukommelsen.
+    .xlsx/.docx er allerede komprimerede, så de lægges ukomprimeret (STORED) i ZIP'en.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+        for name, buf in entries:
+            view = buf.getbuffer()
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            with zf.open(info, "w") as dst:
+                for pos in range(0, len(view), chunk_size):
+                    dst.write(view[pos:pos + chunk_size])
+                    data = sink.pop()
+                    if data:
+                        yield data
+            view.release()
+            data = sink.pop()
+            if data:
+                yield data
+    data = sink.pop()
+    if data:
+        yield data
+
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+
+def warm_up():
+    """importerer og varmer openpyxl/python-docx/numpy, logoet og Word-skabelonerne op"""
+    try:
+        from openpyxl import Workbook
+        from docx import Document
+        _numpy()
+        get_logo_assets()
+        _compile_ooxml("pdd", PDD_LAYOUT)
+        _compile_ooxml("ledelse", LEADERSHIP_LAYOUT)
+        Workbook()
+        Document()
+    except Exception:
+        pass
+
+
+def _batch_worker_init():
+    """kører én gang pr. worker"""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()  # slået til i workeren (fx via PYTHONTRACEMALLOC) – profileringen sker kun i serverprocessen
+    warm_up()
+
+
+def _batch_worker(index: int, c: dict, outdir: str, stamp: str, docx_backend: str = None) -> dict:
+    try:
+        result = build_case(c, outdir=outdir, stamp=stamp, docx_backend=docx_backend)
+        result["index"] = index
+        return result
+    except Exception as e:
+        return {"index": index, "procesnavn": c.get("procesnavn", ""), "error": str(e)}
+
+
+def get_batch_pool() -> ProcessPoolExecutor:
+    """én varm ProcessPoolExecutor til hele programmets levetid"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            # spawn, ikke fork: serveren svarer fra flere tråde, og en fork midt i dem kan arve låse,
+            # der aldrig bliver låst op. Hver worker varmes op én gang i _batch_worker_init.
+            _batch_pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_batch_worker_init,
+            )
+        return _batch_pool
+
+
+def run_batch(forms, outdir: str = None, docx_backend: str = None) -> dict:
+    """
+    Genererer business cases for mange formularer parallelt.
+    forms: liste af dicts (samme felter som empty_form()).
+    docx_backend: "docx" eller "ooxml" (default DOCX_BACKEND, ligesom /generate).
+    Returnerer ét samlet manifest over alle producerede filer.
+    """
+    docx_backend = docx_backend or DOCX_BACKEND
+    t0 = time.perf_counter()
+    outdir = outdir or ensure_output_dir()
+    stamp = datetime.now().strftime("%Y%m%d_%H%M")
+    cases = [normalize_form(f) for f in forms]
+    keys = [form_cache_key(c, _generate_variant(outdir, False, False, docx_backend)) for c in cases]
+
+    results = []
+    todo = []
+    for i, key in enumerate(keys):
+        cached = artifact_cache.get(key)
+        if cached is not None:
+            results.append(dict(cached, index=i, cached=True))
+        else:
+            todo.append(i)
+
+    if todo:
+        pool = get_batch_pool()
+        # løbenummer i filnavnet, så to cases med samme procesnavn ikke overskriver hinanden
+        futures = {
+            pool.submit(_batch_worker, i, cases[i], outdir, f"{stamp}_{i + 1:04d}", docx_backend): i
+            for i in todo
+        }
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                result = {"index": i, "procesnavn": cases[i].get("procesnavn", ""), "error": str(e)}
+            observe_spans("batch", result.pop("spans", None))
+            if "error" not in result:
+                artifact_cache.put(keys[i], {k: v for k, v in result.items() if k != "index"})
+            results.append(result)
+    results.sort(key=lambda r: r["index"])
+    record_cases(
+        [(cases[r["index"]], r["metrics"], r["files"]) for r in results if "error" not in r and not r.get("cached")],
+        "batch",
+    )
+    record_cases([(cases[r["index"]], r["metrics"], r["files"]) for r in results if r.get("cached")], "cached")
+
+    failed = sum(1 for r in results if "error" in r)
+    return {
+        "outdir": outdir,
+        "count": len(results),
+        "ok": len(results) - failed,
+        "failed": failed,
+        "workers": BATCH_WORKERS,
+        "cached": sum(1 for r in results if r.get("cached")),
+        "docx_backend": docx_backend,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "cases": results,
+    }
+
+
+# ============================================================
+# AFSNIT 7c – BAGGRUNDSJOBS
+# ============================================================
+class JobRegistry:
+    """
+    Trådsikker oversigt over baggrundsjobs.
+    Færdige jobs smides ud, når de er ældre end ttl sekunder.
+    Hver ændring tæller 'version' op og vækker dem, der venter (SSE-streams).
+    Buffere i færdige jobs holdes under max_buffer_bytes – de ældste slippes først.
+    """
+
+    def __init__(self, ttl: int = JOB_TTL_SECONDS, max_buffer_bytes: int = JOB_MAX_BUFFER_MB * 1024 * 1024):
+        self.ttl = ttl
+        self.max_buffer_bytes = max_buffer_bytes
+        self._jobs = {}
+        self._cond = threading.Condition()
+
+    def _evict_locked(self):
+        now = time.time()
+        dead = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished"] and now - job["finished"] > self.ttl
+        ]
+        for job_id in dead:
+            del self._jobs[job_id]
+
+    def _trim_buffers_locked(self):
+        held = [job for job in self._jobs.values() if (job["result"] or {}).get("buffers")]
+        total = sum(_result_size(job["result"]) for job in held)
+        for job in sorted(held, key=lambda j: j["finished"] or j["created"]):
+            if total <= self.max_buffer_bytes:
+                break
+            total -= _result_size(job["result"])
+            job["result"] = {k: v for k, v in job["result"].items() if k != "buffers"}
+            job["version"] += 1
+
+    def create(self, kind: str = "generate", max_pending: int = None):
+        """
+        nyt job i kø. Med max_pending returneres None, hvis der allerede venter/kører så mange –
+        tjek og oprettelse sker under samme lås, så samtidige requests ikke kan snige sig forbi grænsen.
+        """
+        with self._cond:
+            self._evict_locked()
+            if max_pending is not None and self._pending_locked() >= max_pending:
+                return None
+            job_id = uuid.uuid4().hex
+            job = {
+                "id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "step": "I kø",
+                "progress": 0,
+                "created": time.time(),
+                "finished": None,
+                "result": None,
+                "error": None,
+                "version": 0,
+            }
+            self._jobs[job_id] = job
+            return dict(job)
+
+    def update(self, job_id: str, **fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if fields.get("status") in ("done", "failed"):
+                job["finished"] = time.time()
+            job["version"] += 1
+            if "result" in fields:
+                self._trim_buffers_locked()
+            self._cond.notify_all()
+
+    def get(self, job_id: str):
+        with self._cond:
+            self._evict_locked()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, version: int, timeout: float):
+        """vent til jobbet har en nyere version end 'version' (eller timeout) og returnér det"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: job_id not in self._jobs or self._jobs[job_id]["version"] > version,
+                timeout=timeout,
+            )
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _pending_locked(self) -> int:
+        return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending_locked()
+
+
+jobs = JobRegistry()
+_job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="bc-job")
+
+
+def _run_generate_job(job_id: str, c: dict, outdir: str, in_memory: bool = False, keep_copy: bool = False):
+    try:
+        _generate_job(job_id, c, outdir, in_memory, keep_copy)
+    finally:
+        activity.end()
+
+
+def _generate_job(job_id: str, c: dict, outdir: str, in_memory: bool, keep_copy: bool):
+    created = (jobs.get(job_id) or {}).get("created")
+    queued = [("queue", max(0.0, time.time() - created))] if created else []
+    jobs.update(job_id, status="running", step="Starter", progress=1)
+    try:
+        with memory_profiler.window("generate", out_of_process=JOB_PROCESSES,
+                                    job_id=job_id, procesnavn=c.get("procesnavn", "")):
+            if JOB_PROCESSES:
+                # byg i batch-puljens processer, så samtidige jobs ikke står i kø for den samme GIL
+                jobs.update(job_id, step="Bygger filer", progress=10)
+                result = get_batch_pool().submit(
+                    build_case, c, outdir=outdir, in_memory=in_memory, keep_copy=keep_copy,
+                ).result()
+            else:
+                result = build_case(
+                    c, outdir=outdir, in_memory=in_memory, keep_copy=keep_copy,
+                    progress=lambda name, pct: jobs.update(job_id, step=name, progress=pct),
+                )
+    except Exception as e:
+        jobs.update(job_id, status="failed", step="Fejl", error=str(e))
+        return
+    # spans hører til dette job, ikke til cachen (også når de kommer fra en worker-proces)
+    spans = queued + result.pop("spans", [])
+    observe_spans("generate", spans)
+    record_cases([(c, result["metrics"], result["files"])], "generate")
+    artifact_cache.put(form_cache_key(c, _generate_variant(outdir, in_memory, keep_copy)), result)
+    jobs.update(job_id, status="done", step="Færdig", progress=100, result=result, spans=spans)
+
+
+def submit_generate_job(c: dict, outdir: str = None, in_memory: bool = False, keep_copy: bool = False):
+    """
+    læg en generering i kø – returnerer job-id, eller None hvis køen er fuld.
+    Findes identiske artefakter allerede i cachen, er jobbet færdigt med det samme.
+    """
+    outdir = outdir or ensure_output_dir()
+    cached = artifact_cache.get(form_cache_key(c, _generate_variant(outdir, in_memory, keep_copy)))
+    if cached is not None:
+        job = jobs.create("generate")
+        jobs.update(job["id"], status="done", step="Færdig (fra cache)", progress=100, result=cached)
+        record_cases([(c, cached["metrics"], cached["files"])], "cached")
+        return job["id"]
+
+    if activity.stopping:
+        return None
+    job = jobs.create("generate", max_pending=JOB_MAX_PENDING)
+    if job is None:
+        return None
+    activity.begin()
+    try:
+        _job_pool.submit(_run_generate_job, job["id"], c, outdir, in_memory, keep_copy)
+    except Exception:
+        activity.end()
+        raise
+    return job["id"]
+
+
+def job_view(job: dict) -> dict:
+    """den del af et job, der sendes til browseren"""
+    view = {k: job[k] for k in ("id", "status", "step", "progress", "error")}
+    result = job.get("result") or {}
+    files = result.get("files") or {}
+    view["urls"] = {k: f"/output/{os.path.basename(v)}" for k, v in files.items()}
+    if result.get("buffers"):
+        view["zip_url"] = f"/jobs/{job['id']}/download.zip"
+    if result.get("timings"):
+        view["timings"] = result["timings"]
+    return view
+
+
+# ============================================================
+# AFSNIT 7d – PORTEFØLJE-EXCEL (én række pr. proces, streamet)
+# ============================================================
+PORTFOLIO_INPUTS = [k for k in empty_form() if k != "extra_json"]
+PORTFOLIO_METRICS = [
+    "minutter_pr_aar", "timer_pr_aar", "fte", "timeloen",
+    "omkostning_foer", "omkostning_efter", "aarlig_besparelse", "break_even_aar",
+]
+PORTFOLIO_RANKS = ["rang_besparelse", "rang_break_even", "rst_score"]
+
+
+def _windows_memory_counters():
+    """GetProcessMemoryInfo på Windows (None andre steder)"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters
+    except Exception:
+        pass
+    return None
+
+
+def rss_bytes() -> int:
+    """processens RSS lige nu (0 hvis platformen ikke kan oplyse det)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    counters = _windows_memory_counters()
+    return int(counters.WorkingSetSize) if counters else 0
+
+
+@contextmanager
+def rss_peak_delta(interval: float = 0.02):
+    """
+    Hvor meget RSS voksede (på sit højeste) mens blokken kørte – målt i en baggrundstråd hvert interval sekund.
+    Processens livstids-peak (ru_maxrss) kan ikke bruges: efter én stor eksport viser den det samme for alle
+    efterfølgende. tracemalloc ville ramme den rigtige top, men gør en eksport ~5x langsommere.
+    Tallet er for hele processen, så samtidige requests tæller med. Giver {"bytes": …} (0 hvis RSS er ukendt).
+    """
+    result = {"bytes": 0}
+    start = rss_bytes()
+    if not start:
+        yield result
+        return
+    peak = [start]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], rss_bytes())
+
+    sampler = threading.Thread(target=sample, name="rss-sampler", daemon=True)
+    sampler.start()
+    try:
+        yield result
+    finally:
+        done.set()
+        sampler.join()
+        result["bytes"] = max(peak[0], rss_bytes()) - start
+
+
+def _ranks(values, descending: bool, valid=None) -> list:
+    """1 = bedst; rækker der ikke er 'valid' får ingen rang (None)"""
+    np = _numpy()
+    if np is not None and isinstance(values, np.ndarray):
+        valid = np.ones(len(values), dtype=bool) if valid is None else np.asarray(valid)
+        idx = np.flatnonzero(valid)
+        order = idx[np.argsort(-values[idx] if descending else values[idx], kind="stable")]
+        ranks = [None] * len(values)
+        for r, i in enumerate(order.tolist(), start=1):
+            ranks[i] = r
+        return ranks
+    n = len(values)
+    valid = valid if valid is not None else [True] * n
+    idx = [i for i in range(n) if valid[i]]
+    idx.sort(key=lambda i: values[i], reverse=descending)
+    ranks = [None] * n
+    for r, i in enumerate(idx, start=1):
+        ranks[i] = r
+    return ranks
+
+
+def build_portfolio_excel(path, cases) -> dict:
+    """
+    Én samlet projektmappe med én række pr. proces: input, alle calc_metrics-tal og rangering.
+    Bruger openpyxl's write-only mode, så rækkerne streames til disk og hukommelsen ikke vokser med antallet.
+    Returnerer {"rows", "seconds", "peak_rss_delta_mb"} – det sidste er hvor meget RSS voksede under eksporten.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    np = _numpy()
+    _yellow, GREY = excel_fills()
+    t0 = time.perf_counter()
+    n = len(cases)
+
+    with rss_peak_delta() as rss:
+        # nøgletallene som kolonner; rækkerne laves først, når de skrives
+        metrics = calc_metrics_portfolio(list(cases))
+        besparelse = metrics["aarlig_besparelse"]
+        break_even = metrics["break_even_aar"]
+        rang_besparelse = _ranks(besparelse, descending=True)
+        rang_break_even = _ranks(break_even, descending=False, valid=[b > 0 for b in besparelse])
+        metric_rows = zip(*(metrics[k].tolist() if np is not None else metrics[k] for k in PORTFOLIO_METRICS))
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Portefølje")
+        ws.freeze_panes = "B2"
+        header = PORTFOLIO_INPUTS + PORTFOLIO_METRICS + PORTFOLIO_RANKS
+        bold = Font(bold=True)
+        header_cells = []
+        for title in header:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.font = bold
+            cell.fill = GREY
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        for i, (c, metric_row) in enumerate(zip(cases, metric_rows)):
+            rst = sum(to_number(c.get(k), 0.0) for k in ("rst_regel", "rst_stabil", "rst_tid"))
+            ws.append(
+                [c.get(k, "") for k in PORTFOLIO_INPUTS]
+                + list(metric_row)
+                + [rang_besparelse[i], rang_break_even[i], rst]
+            )
+
+        wb.save(path)
+    return {
+        "rows": n,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "peak_rss_delta_mb": round(rss["bytes"] / (1024 * 1024), 1),
+    }
+
+
+# ============================================================
+# AFSNIT 7e – MASSE-INDLÆSNING AF SPØRGESKEMAER (ZIP / mange filer)
+# ============================================================
+# formularens talfelter plus RPA-egnethedsscorerne, som spørgeskemaet også spørger til
+CHECKED_NUMBER_FIELDS = NUMERIC_FIELDS + ["rst_regel", "rst_stabil", "rst_tid"]
+
+
+def validate_numbers(c: dict) -> list:
+    """talfelter der er udfyldt, men som to_number ikke kan læse"""
+    return [
+        f"{key}: '{c[key]}' er ikke et tal"
+        for key in CHECKED_NUMBER_FIELDS
+        if str(c.get(key) or "").strip() and to_number(c.get(key), None) is None
+    ]
+
+
+def _ingest_worker(name: str, raw: bytes) -> dict:
+    """kører i en worker-proces: én fil -> en eller flere cases (eller en fejl)"""
+    entry = {"file": name, "cases": [], "error": None}
+    try:
+        if name.lower().endswith(".docx"):
+            form, confidence = parse_docx_questionnaire(io.BytesIO(raw))
+            if form is None:
+                raise ValueError("ikke et gyldigt Word-dokument")
+            found = [(form, confidence)]
+        else:
+            data = json.loads(raw.decode("utf-8-sig"))
+            items = data if isinstance(data, list) else [data]
+            if not all(isinstance(x, dict) for x in items):
+                raise ValueError("forventede et JSON-objekt eller et array af objekter")
+            found = [(form_from_json(x), {}) for x in items]
+        for form, confidence in found:
+            entry["cases"].append({
+                "form": form,
+                "confidence": confidence,
+                "warnings": validate_numbers(form),
+            })
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
+
+class UploadRejected(ValueError):
+    """uploaden overskrider en af INGEST_MAX_*-grænserne"""
+
+
+def check_zip_limits(files):
+    """
+    Tjekker ZIP-filernes indholdsfortegnelse, før noget pakkes ud: antal filer, udpakket størrelse
+    pr. fil og i alt, og kompressionsforhold. Rejser UploadRejected ved overskridelse.
+    """
+    members = 0
+    total = 0
+    max_member = INGEST_MAX_MEMBER_MB * 1024 * 1024
+    for name, raw in files:
+        if not name.lower().endswith(".zip"):
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(raw)) as zf:
+                infos = [info for info in zf.infolist() if not info.is_dir()]
+        except zipfile.BadZipFile:
+            continue  # rapporteres som ødelagt ZIP af _expand_uploads
+        for info in infos:
+            members += 1
+            total += info.file_size
+            if members > INGEST_MAX_MEMBERS:
+                raise UploadRejected(f"For mange filer i ZIP (max {INGEST_MAX_MEMBERS}).")
+            if info.file_size > max_member:
+                raise UploadRejected(f"{name}/{info.filename} er over {INGEST_MAX_MEMBER_MB} MB udpakket.")
+            if info.file_size > 1024 * 1024 and info.file_size > INGEST_MAX_RATIO * max(1, info.compress_size):
+                raise UploadRejected(f"{name}/{info.filename} er pakket mistænkeligt hårdt (over {INGEST_MAX_RATIO}:1).")
+            if total > INGEST_MAX_TOTAL_MB * 1024 * 1024:
+                raise UploadRejected(f"ZIP-filerne fylder over {INGEST_MAX_TOTAL_MB} MB udpakket.")
+
+
+def _expand_uploads(files):
+    """[(navn, bytes)] -> kun .docx/.json, med indholdet af evt. ZIP-filer pakket ud (lazy – én fil ad gangen)"""
+    for name, raw in files:
+        lower = name.lower()
+        if lower.endswith(".zip"):
+            try:
+                with zipfile.ZipFile(io.BytesIO(raw)) as zf:
+                    for info in zf.infolist():
+                        member = info.filename
+                        base = os.path.basename(member)
+                        if info.is_dir() or member.startswith("__MACOSX/") or base.startswith("~$"):
+                            continue
+                        if base.lower().endswith((".docx", ".json")):
+                            # file_size er tjekket i check_zip_limits; læs aldrig mere end den angivne størrelse
+                            with zf.open(info) as fh:
+                                data = fh.read(info.file_size + 1)
+                            if len(data) > info.file_size:
+                                raise UploadRejected(f"{name}/{member} er større end angivet i ZIP'en.")
+                            yield f"{name}/{member}", data
+            except zipfile.BadZipFile:
+                yield name, None
+        elif lower.endswith((".docx", ".json")):
+            yield name, raw
+        else:
+            yield name, None
+
+
+def ingest_files(files) -> dict:
+    """
+    Indlæser mange udfyldte spørgeskemaer (.docx/.json, også inde i ZIP) parallelt i worker-processer.
+    files: [(filnavn, bytes)]. Returnerer cases klar til run_batch + en fejlrapport pr. fil.
+    Filerne pakkes ud og sendes til puljen INGEST_CHUNK ad gangen, så højst så mange ligger i hukommelsen.
+    Rejser UploadRejected, hvis en ZIP overskrider INGEST_MAX_*-grænserne.
+    """
+    t0 = time.perf_counter()
+    check_zip_limits(files)
+    entries = []
+    pool = None
+
+    def drain(futures):
+        for fut in as_completed(futures):
+            i, name = futures[fut]
+            try:
+                entries.append((i, fut.result()))
+            except Exception as e:
+                entries.append((i, {"file": name, "cases": [], "error": str(e)}))
+
+    futures = {}
+    for i, (name, raw) in enumerate(_expand_uploads(files)):
+        if raw is None:
+            entries.append((i, {"file": name, "cases": [], "error": "ikke understøttet filtype eller ødelagt ZIP"}))
+            continue
+        pool = pool or get_batch_pool()
+        futures[pool.submit(_ingest_worker, name, raw)] = (i, name)
+        if len(futures) >= INGEST_CHUNK:
+            drain(futures)
+            futures = {}
+    drain(futures)
+    entries.sort(key=lambda e: e[0])
+
+    cases = []
+    report = []
+    for _i, entry in entries:
+        for case in entry["cases"]:
+            cases.append(dict(case, file=entry["file"]))
+        report.append({
+            "file": entry["file"],
+            "cases": len(entry["cases"]),
+            "error": entry["error"],
+            "warnings": [w for case in entry["cases"] for w in case["warnings"]],
+        })
+    return {
+        "count": len(cases),
+        "files": len(report),
+        "failed": sum(1 for r in report if r["error"]),
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "cases": cases,
+        "report": report,
+    }
+
+
+# ============================================================
+# AFSNIT 7f – CASE-INDEKS (SQLite: input, nøgletal, filer og tidspunkt pr. generering)
+# ============================================================
+# {id} er rækkens id (i indsættelsesrækkefølge); "nyeste" følger indekset på (created, id)
+CASE_SORTS = {
+    "nyeste": "cases.created DESC, {id} DESC",
+    "besparelse": "cases.aarlig_besparelse DESC, {id} DESC",
+    "navn": "cases.procesnavn, {id} DESC",
+}
 
-    # RTS
-    ws4 = wb.create_sheet("RTS (TO-BE)")
-    ws4["A1"] = "TO-BE beskrivelse"
-    ws4["A2"] = c.get("to_be_beskrivelse", "")
-    ws4["A2"].alignment = Alignment(wrap_text=True)
 
-    # Økonomi
-    ws5 = wb.create_sheet("Økonomi")
-    ws5["A1"] = "Parameter"
-    ws5["B1"] = "Værdi"
-    ws5["A2"] = "Minutter pr. år"
-    ws5["B2"] = m["minutter_pr_aar"]
-    ws5["A3"] = "Timer pr. år"
-    ws5["B3"] = m["timer_pr_aar"]
-    ws5["A4"] = "Årlig omkostning før"
-    ws5["B4"] = m["omkostning_foer"]
-    ws5["A5"] = "Årlig omkostning efter"
-    ws5["B5"] = m["omkostning_efter"]
-    ws5["A6"] = "Årlig besparelse"
-    ws5["B6"] = m["aarlig_besparelse"]
-    ws5["A7"] = "Investering"
-    ws5["B7"] = to_number(c.get("investering_kr"), 0.0)
-    ws5["A8"] = "Break-even (år)"
-    ws5["B8"] = m["break_even_aar"]
+class CaseIndex:
+    """
+    Én række pr. genereret case. Indekseret på procesnavn, procesejer, besparelse og dato;
+    fritekst går gennem FTS5 (ord-præfiks), hvis SQLite har den – ellers LIKE.
+    Én forbindelse pr. tråd og WAL, så søgninger ikke venter på jobs, der skriver.
+    Den fulde formular og alle nøgletal ligger i case_data, så søge-tabellen forbliver smal.
+    Et cache-træf giver ikke en ny række: den seneste række med samme formular-hash får last_seen og hits talt op.
+    """
 
-    # Business Case
-    ws6 = wb.create_sheet("Business Case")
-    ws6["A1"] = "Business Case – samlet vurdering"
-    ws6["A3"] = "Anbefaling"
-    ws6["B3"] = "Automatisering anbefales – lav risiko, hurtig gevinst."
-    ws6["A5"] = "Kvalitative gevinster"
-    ws6["B5"] = c.get("kvalitative", "")
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cases (
+            id INTEGER PRIMARY KEY,
+            created TEXT NOT NULL,
+            source TEXT NOT NULL,
+            procesnavn TEXT NOT NULL COLLATE NOCASE,
+            proces_ejer TEXT NOT NULL COLLATE NOCASE,
+            aarlig_besparelse REAL,
+            break_even_aar REAL,
+            fte REAL,
+            files_json TEXT NOT NULL,
+            form_hash TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE IF NOT EXISTS case_data (
+            case_id INTEGER PRIMARY KEY REFERENCES cases (id) ON DELETE CASCADE,
+            form_json TEXT NOT NULL,
+            metrics_json TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS cases_procesnavn ON cases (procesnavn);
+        CREATE INDEX IF NOT EXISTS cases_proces_ejer ON cases (proces_ejer, created);
+        CREATE INDEX IF NOT EXISTS cases_besparelse ON cases (aarlig_besparelse);
+        CREATE INDEX IF NOT EXISTS cases_created ON cases (created);
+        CREATE INDEX IF NOT EXISTS cases_form_hash ON cases (form_hash);
+    """
 
-    # Ledelse – kort overblik
-    ws7 = wb.create_sheet("Ledelse")
-    ws7["A1"] = "Ledelsesoverblik"
-    ws7["A1"].font = Font(size=14, bold=True)
-    ws7["A3"] = "Procesnavn"
-    ws7["B3"] = c.get("procesnavn", "")
-    ws7["A4"] = "Årlig besparelse"
-    ws7["B4"] = m["aarlig_besparelse"]
-    ws7["A5"] = "Investering"
-    ws7["B5"] = to_number(c.get("investering_kr"), 0.0)
-    ws7["A6"] = "Break-even (år)"
-    ws7["B6"] = m["break_even_aar"]
-    ws7["A8"] = "Anbefaling"
-    ws7["B8"] = "Automatisering anbefales – lav risiko, tydelig effekt."
-    ws7.column_dimensions["A"].width = 28
-    ws7.column_dimensions["B"].width = 50
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts
+            USING fts5(procesnavn, proces_ejer, content='cases', content_rowid='id');
+        CREATE TRIGGER IF NOT EXISTS cases_fts_insert AFTER INSERT ON cases BEGIN
+            INSERT INTO cases_fts (rowid, procesnavn, proces_ejer) VALUES (new.id, new.procesnavn, new.proces_ejer);
+        END;
+        CREATE TRIGGER IF NOT EXISTS cases_fts_delete AFTER DELETE ON cases BEGIN
+            INSERT INTO cases_fts (cases_fts, rowid, procesnavn, proces_ejer)
+                VALUES ('delete', old.id, old.procesnavn, old.proces_ejer);
+        END;
+    """
 
-    wb.save(path)
+    def __init__(self, path: str):
+        self.path = path
+        self.fts = False
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._ensure_schema(conn)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.executescript(self.SCHEMA)
+            try:
+                conn.executescript(self.FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                self.fts = False  # SQLite uden FTS5 – søgning falder tilbage til LIKE
+            self._schema_ready = True
+
+    def record_many(self, entries, source: str) -> int:
+        """
+        entries: [(formular, nøgletal, filer)] – én transaktion; returnerer antal nye rækker.
+        source="cached": findes formularen allerede, tælles dens hits op i stedet for en ny række.
+        """
+        entries = list(entries)
+        if not entries:
+            return 0
+        created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = self._conn()
+        inserted = 0
+        with conn:
+            for c, m, files in entries:
+                form_hash = form_cache_key(c)
+                if source == "cached":
+                    cur = conn.execute(
+                        "UPDATE cases SET last_seen = ?, hits = hits + 1 WHERE id ="
+                        " (SELECT id FROM cases WHERE form_hash = ? ORDER BY id DESC LIMIT 1)",
+                        (created, form_hash),
+                    )
+                    if cur.rowcount:
+                        continue
+                names = {k: os.path.relpath(v, OUTPUT_DIR).replace(os.sep, "/") for k, v in (files or {}).items()}
+                cur = conn.execute(
+                    "INSERT INTO cases (created, source, procesnavn, proces_ejer, aarlig_besparelse, break_even_aar,"
+                    " fte, files_json, form_hash, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (created, source, c.get("procesnavn", ""), c.get("proces_ejer", ""),
+                     m.get("aarlig_besparelse"), m.get("break_even_aar"), m.get("fte"),
+                     json.dumps(names, ensure_ascii=False), form_hash, created),
+                )
+                inserted += 1
+                conn.execute(
+                    "INSERT INTO case_data (case_id, form_json, metrics_json) VALUES (?, ?, ?)",
+                    (cur.lastrowid, json.dumps(c, ensure_ascii=False, default=str),
+                     json.dumps(m, ensure_ascii=False, default=str)),
+                )
+        return inserted
+
+    def search(self, q: str = "", owner: str = "", min_savings: float = None, date_from: str = "",
+               date_to: str = "", sort: str = "nyeste", limit: int = CASES_PAGE_SIZE, offset: int = 0) -> tuple:
+        """-> (én side af oversigten, antal i alt)"""
+        conn = self._conn()
+        source, row_id = "cases", "cases.id"
+        where, args = [], []
+        words = re.findall(r"\w+", q or "")
+        if words and self.fts:
+            # CROSS JOIN låser FTS som ydre tabel – ellers kan planneren vælge en plan,
+            # der kører fuldtekstsøgningen én gang pr. række i et andet indeks
+            source, row_id = "cases_fts CROSS JOIN cases ON cases.id = cases_fts.rowid", "cases_fts.rowid"
+            where.append("cases_fts MATCH ?")
+            args.append(" ".join(f'"{w}"*' for w in words))
+        elif words:
+            for w in words:
+                where.append("(cases.procesnavn LIKE ? OR cases.proces_ejer LIKE ?)")
+                args += [f"%{w}%"] * 2
+        if owner:
+            where.append("cases.proces_ejer = ?")
+            args.append(owner)
+        if min_savings is not None:
+            where.append("cases.aarlig_besparelse >= ?")
+            args.append(min_savings)
+        if date_from:
+            where.append("cases.created >= ?")
+            args.append(date_from)
+        if date_to:
+            where.append("cases.created < date(?, '+1 day')")
+            args.append(date_to)
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+        if where == ["cases_fts MATCH ?"]:
+            # kun fritekst: FTS-indekset kan tælle selv
+            total = conn.execute("SELECT COUNT(*) FROM cases_fts WHERE cases_fts MATCH ?", args).fetchone()[0]
+        else:
+            total = conn.execute(f"SELECT COUNT(*) FROM {source}{clause}", args).fetchone()[0]
+        order = CASE_SORTS.get(sort, CASE_SORTS["nyeste"]).format(id=row_id)
+        if source != "cases" and order.startswith("cases.created DESC"):
+            order = f"{row_id} DESC"  # fritekst: FTS leverer træffene i id-orden, og id følger tiden
+        rows = conn.execute(
+            "SELECT cases.id, cases.created, cases.source, cases.procesnavn, cases.proces_ejer,"
+            " cases.aarlig_besparelse, cases.break_even_aar, cases.fte, cases.files_json,"
+            " cases.last_seen, cases.hits"
+            f" FROM {source}{clause} ORDER BY {order} LIMIT ? OFFSET ?",
+            args + [limit, offset],
+        ).fetchall()
+        return [self._summary(r) for r in rows], total
+
+    @staticmethod
+    def _summary(r) -> dict:
+        """række -> dict; filerne som /output-links (filer gemt uden for output-mappen får intet link)"""
+        d = {k: r[k] for k in r.keys() if k not in ("files_json", "form_json", "metrics_json", "form_hash")}
+        d["urls"] = {k: f"/output/{v}" for k, v in json.loads(r["files_json"]).items() if not v.startswith("..")}
+        return d
+
+    def get(self, case_id: int):
+        r = self._conn().execute(
+            "SELECT * FROM cases JOIN case_data ON case_data.case_id = cases.id WHERE cases.id = ?", (case_id,)
+        ).fetchone()
+        if r is None:
+            return None
+        d = self._summary(r)
+        d.pop("case_id", None)
+        d["form"] = json.loads(r["form_json"])
+        d["metrics"] = json.loads(r["metrics_json"])
+        return d
+
+    def owners(self, limit: int = 500) -> list:
+        return [r[0] for r in self._conn().execute(
+            "SELECT DISTINCT proces_ejer FROM cases WHERE proces_ejer != '' ORDER BY proces_ejer LIMIT ?", (limit,))]
+
+
+case_index = CaseIndex(CASE_DB) if CASE_DB else None
+
+
+def record_cases(entries, source: str):
+    """
+    læg genererede cases i indekset – en fejl her må aldrig vælte selve genereringen.
+    source: "generate", "batch" eller "cached" (svaret kom fra artefakt-cachen, filerne er en tidligere kørsels).
+    """
+    if case_index is None:
+        return
+    try:
+        case_index.record_many(entries, source)
+    except Exception as e:
+        print(f"[case-indeks] kunne ikke gemme {len(entries)} case(s): {e}")
 
 
 # ============================================================
@@ -607,7 +3185,7 @@ FORM_HTML = r"""
   <meta charset="utf-8">
   <title>{{ title }}</title>
   <meta name="viewport" content="width=device-width, initial-scale=1">
-  <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+  <link href="{{ static_url(BOOTSTRAP_CSS) }}" rel="stylesheet">
   <style>
     body { background:#f4f6fb; }
     .card { border-radius:16px; box-shadow:0 8px 30px rgba(0,0,0,.06); }
@@ -621,9 +3199,9 @@ FORM_HTML = r"""
   <!-- TOP / LOGO -->
   <div class="brand mb-3">
     {% if logo_png %}
-      <img src="/static/kisbye_logo.png" alt="Kisbye Consulting" class="logo">
+      <img src="{{ static_url('kisbye_logo.png') }}" alt="Kisbye Consulting" class="logo">
     {% elif logo_ico %}
-      <img src="/static/kisbye_logo.ico" alt="Kisbye Consulting" width="84" height="84">
+      <img src="{{ static_url('kisbye_logo.ico') }}" alt="Kisbye Consulting" width="84" height="84">
     {% endif %}
     <h3 class="text-center">{{ title }}</h3>
     <p class="text-muted mb-0">Indtast én proces – få Excel + 2 Word-dokumenter</p>
@@ -635,6 +3213,9 @@ FORM_HTML = r"""
     <div class="d-flex flex-wrap gap-2 justify-content-between align-items-center mb-3">
       <h4 class="mb-0">1. Grundlæggende oplysninger</h4>
       <div class="d-flex gap-2">
+        {% if case_index %}
+        <a href="{{ url_for('cases') }}" class="btn btn-outline-primary btn-sm">Tidligere cases</a>
+        {% endif %}
         <a href="{{ url_for('download_word_template') }}" class="btn btn-outline-primary btn-sm">
           Download spørgeskema (Word)
         </a>
@@ -732,6 +3313,26 @@ FORM_HTML = r"""
         </div>
       </div>
 
+      <h4 class="section-title">Usikkerhed (valgfrit)</h4>
+      <p class="text-muted mb-2">Bruges til P10/P50/P90 for besparelse og break-even. Tomme min/max = ± procent omkring værdien ovenfor.</p>
+      <div class="row g-3">
+        <div class="col-md-3">
+          <label class="form-label">Usikkerhed (± %)</label>
+          <input type="number" name="usikkerhed_pct" class="form-control" value="{{ f.usikkerhed_pct }}">
+        </div>
+      </div>
+      <div class="row g-2 mt-1">
+        {% for key, label in uncertain_fields %}
+        <div class="col-md-4">
+          <label class="form-label small mb-1">{{ label }} – min / max</label>
+          <div class="input-group input-group-sm">
+            <input type="number" step="any" name="{{ key }}_min" class="form-control" value="{{ f[key ~ '_min'] }}" placeholder="min">
+            <input type="number" step="any" name="{{ key }}_max" class="form-control" value="{{ f[key ~ '_max'] }}" placeholder="max">
+          </div>
+        </div>
+        {% endfor %}
+      </div>
+
       <h4 class="section-title">4. Fejl, input, output</h4>
       <div class="row g-3">
         <div class="col-md-6">
@@ -771,7 +3372,18 @@ FORM_HTML = r"""
         </div>
       </div>
 
-      <div class="mt-4 d-flex gap-2">
+      <div class="mt-4">
+        <div class="form-check">
+          <input class="form-check-input" type="checkbox" name="levering_zip" value="1" id="levering_zip">
+          <label class="form-check-label" for="levering_zip">Hent som én ZIP – filerne bygges i hukommelsen og gemmes ikke på disken</label>
+        </div>
+        <div class="form-check">
+          <input class="form-check-input" type="checkbox" name="gem_kopi" value="1" id="gem_kopi">
+          <label class="form-check-label" for="gem_kopi">… og gem alligevel en kopi i output-mappen</label>
+        </div>
+      </div>
+
+      <div class="mt-3 d-flex gap-2">
         <button class="btn btn-primary btn-lg" type="submit">Generér Business Case</button>
         <a class="btn btn-outline-secondary" href="{{ url_for('index') }}">Nulstil</a>
       </div>
@@ -788,18 +3400,29 @@ RESULT_HTML = r"""
 <head>
   <meta charset="utf-8">
   <title>Resultat – BusinessCaseGPT v9.1</title>
-  <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+  <link href="{{ static_url(BOOTSTRAP_CSS) }}" rel="stylesheet">
 </head>
 <body class="bg-light">
 <div class="container py-4">
   <div class="card p-4">
-    <h3 class="mb-2">✅ Business case genereret</h3>
-    <p class="text-muted">Filerne er gemt i <code>{{ outdir }}</code></p>
-    <ul>
-      <li>📊 <a href="{{ excel_url }}">Excel – Business Case</a></li>
-      <li>📝 <a href="{{ pdd_url }}">Word – PDD + RTS</a></li>
-      <li>📋 <a href="{{ lb_url }}">Word – Ledelsesbeskrivelse</a></li>
+    <h3 class="mb-2" id="status">⏳ Business case genereres …</h3>
+    <div class="progress mb-2" style="height:8px">
+      <div id="bar" class="progress-bar" style="width:0%"></div>
+    </div>
+    <p class="text-muted small" id="step">I kø</p>
+    {% if in_memory and not keep_copy %}
+    <p class="text-muted">Filerne bygges i hukommelsen og gemmes ikke på disken.</p>
+    {% else %}
+    <p class="text-muted">Filerne gemmes i <code>{{ outdir }}</code></p>
+    {% endif %}
+    <p id="zipline" class="d-none">🗜️ <a id="zip" href="#" class="btn btn-success btn-sm">Download alle filer som ZIP</a></p>
+    <ul id="files" class="d-none">
+      <li>📊 <a id="excel" href="#">Excel – Business Case</a></li>
+      <li>📝 <a id="pdd" href="#">Word – PDD + RTS</a></li>
+      <li>📋 <a id="ledelse" href="#">Word – Ledelsesbeskrivelse</a></li>
     </ul>
+    <p id="error" class="text-danger d-none"></p>
+    <noscript><a href="{{ url_for('job_status', job_id=job_id) }}">Se status for jobbet</a></noscript>
     <div class="d-flex gap-2 mt-3">
       <a href="{{ url_for('index') }}" class="btn btn-primary">Ny Business Case</a>
       <button id="exitBtn" class="btn btn-outline-danger">Afslut program</button>
@@ -807,6 +3430,48 @@ RESULT_HTML = r"""
   </div>
 </div>
 <script>
+const jobId = "{{ job_id }}";
+function show(job){
+  document.getElementById("bar").style.width = job.progress + "%";
+  document.getElementById("step").textContent = job.step;
+  if (job.status === "done") {
+    document.getElementById("status").textContent = "✅ Business case genereret";
+    for (const [k, url] of Object.entries(job.urls)) {
+      const a = document.getElementById(k);
+      if (a) a.href = url;
+    }
+    if (Object.keys(job.urls).length) document.getElementById("files").classList.remove("d-none");
+    if (job.zip_url) {
+      document.getElementById("zip").href = job.zip_url;
+      document.getElementById("zipline").classList.remove("d-none");
+    }
+  } else if (job.status === "failed") {
+    document.getElementById("status").textContent = "❌ Generering fejlede";
+    const err = document.getElementById("error");
+    err.textContent = job.error || "Ukendt fejl";
+    err.classList.remove("d-none");
+  }
+  return job.status === "done" || job.status === "failed";
+}
+async function poll(){
+  let job;
+  try {
+    const r = await fetch(`/jobs/${jobId}`);
+    job = await r.json();
+    if (!r.ok) job = {status: "failed", progress: 0, step: "Ukendt job", error: job.error};
+  } catch (e) {
+    job = {status: "failed", progress: 0, step: "Ingen forbindelse", error: "Serveren svarer ikke – er programmet lukket?"};
+  }
+  if (!show(job)) setTimeout(poll, 1000);
+}
+if (window.EventSource) {
+  const es = new EventSource(`/jobs/${jobId}/events`);
+  es.onmessage = (e) => { if (show(JSON.parse(e.data))) es.close(); };
+  // forbindelsen røg: stop EventSource' evige genforsøg og hent status direkte (viser fejlen, hvis serveren er væk)
+  es.addEventListener("error", () => { es.close(); poll(); });
+} else {
+  poll();
+}
 document.getElementById("exitBtn").addEventListener("click", async ()=>{
   try { await fetch("/shutdown", {method:"POST"}); } catch(e){}
   window.close();
@@ -816,122 +3481,289 @@ document.getElementById("exitBtn").addEventListener("click", async ()=>{
 </html>
 """
 
+CASES_HTML = r"""
+<!doctype html>
+<html lang="da">
+<head>
+  <meta charset="utf-8">
+  <title>Tidligere cases – BusinessCaseGPT v9.1</title>
+  <link href="{{ static_url(BOOTSTRAP_CSS) }}" rel="stylesheet">
+</head>
+<body class="bg-light">
+<div class="container py-4">
+  <div class="card p-4">
+    <div class="d-flex justify-content-between align-items-center mb-3">
+      <h3 class="mb-0">Tidligere business cases</h3>
+      <a href="{{ url_for('index') }}" class="btn btn-primary btn-sm">Ny Business Case</a>
+    </div>
+    <form method="get" class="row g-2 mb-3">
+      <div class="col-md-3"><input name="q" value="{{ args.q }}" class="form-control form-control-sm" placeholder="Proces eller ejer"></div>
+      <div class="col-md-2">
+        <select name="owner" class="form-select form-select-sm">
+          <option value="">Alle ejere</option>
+          {% for o in owners %}<option {% if o == args.owner %}selected{% endif %}>{{ o }}</option>{% endfor %}
+        </select>
+      </div>
+      <div class="col-md-2"><input name="min_savings" value="{{ args.min_savings }}" class="form-control form-control-sm" placeholder="Min. besparelse (kr)"></div>
+      <div class="col-md-2"><input type="date" name="from" value="{{ args.date_from }}" class="form-control form-control-sm"></div>
+      <div class="col-md-2"><input type="date" name="to" value="{{ args.date_to }}" class="form-control form-control-sm"></div>
+      <div class="col-md-1">
+        <select name="sort" class="form-select form-select-sm">
+          {% for key in sorts %}<option {% if key == args.sort %}selected{% endif %}>{{ key }}</option>{% endfor %}
+        </select>
+      </div>
+      <div class="col-12"><button class="btn btn-outline-secondary btn-sm" type="submit">Søg</button></div>
+    </form>
+    <p class="text-muted small">{{ total }} cases fundet på {{ "%.1f"|format(elapsed_ms) }} ms</p>
+    <table class="table table-sm table-hover align-middle">
+      <thead><tr><th>Dato</th><th>Proces</th><th>Ejer</th><th class="text-end">Årlig besparelse</th><th class="text-end">Break-even (år)</th><th>Filer</th></tr></thead>
+      <tbody>
+      {% for case in cases %}
+        <tr>
+          <td class="text-nowrap">{{ case.created }}{% if case.hits > 1 %} <span class="text-muted small" title="senest {{ case.last_seen }}">×{{ case.hits }}</span>{% endif %}</td>
+          <td><a href="{{ url_for('case_detail', case_id=case.id) }}">{{ case.procesnavn or "(uden navn)" }}</a></td>
+          <td>{{ case.proces_ejer }}</td>
+          <td class="text-end text-nowrap">{{ fmt_dkk(case.aarlig_besparelse) }}</td>
+          <td class="text-end">{{ fmt_num(case.break_even_aar, 1) }}</td>
+          <td class="text-nowrap">
+            {% if case.urls.excel %}<a href="{{ case.urls.excel }}">📊</a>{% endif %}
+            {% if case.urls.pdd %}<a href="{{ case.urls.pdd }}">📝</a>{% endif %}
+            {% if case.urls.ledelse %}<a href="{{ case.urls.ledelse }}">📋</a>{% endif %}
+          </td>
+        </tr>
+      {% endfor %}
+      </tbody>
+    </table>
+    <div class="d-flex gap-2">
+      {% if page > 1 %}<a class="btn btn-outline-secondary btn-sm" href="{{ page_url(page - 1) }}">← Forrige</a>{% endif %}
+      {% if page * page_size < total %}<a class="btn btn-outline-secondary btn-sm" href="{{ page_url(page + 1) }}">Næste →</a>{% endif %}
+    </div>
+  </div>
+</div>
+</body>
+</html>
+"""
+
 
 # ============================================================
 # AFSNIT 9 – ROUTES
 # ============================================================
+class TrackInFlight:
+    """WSGI-lag: hver request tæller som igangværende, indtil svaret er sendt helt (også downloads/streams)"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+        activity.begin()
+        try:
+            body = self.wsgi_app(environ, start_response)
+        except BaseException:
+            activity.end()
+            raise
+        return ClosingIterator(body, activity.end)
+
+
+app.wsgi_app = TrackInFlight(app.wsgi_app)
+
+
+# ---------- målinger pr. request ----------
+@app.before_request
+def start_spans():
+    if METRICS_ENABLED:
+        g.request_started = time.perf_counter()
+        _spans.current = []
+
+
 @app.after_request
-def no_cache(resp):
-    resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    resp.headers["Pragma"] = "no-cache"
+def server_timing_header(resp):
+    """Server-Timing med fasernes tider (+ et færdigt jobs faser på /jobs/<id>) og request-histogrammet"""
+    spans = getattr(_spans, "current", None)
+    if spans is None or "request_started" not in g:
+        return resp
+    total = time.perf_counter() - g.request_started
+    endpoint = request.endpoint or "unknown"
+    resp.headers["Server-Timing"] = server_timing(list(g.get("job_spans") or ()) + spans + [("total", total)])
+    metrics.observe(
+        "bc_request_duration_seconds",
+        (("endpoint", endpoint), ("method", request.method), ("status", str(resp.status_code))),
+        total,
+    )
+    observe_spans(endpoint, spans)
     return resp
 
 
-@app.route("/", methods=["GET"])
-def index():
-    global last_ping
-    last_ping = time.time()
-    return render_template_string(
-        FORM_HTML,
+@app.teardown_request
+def stop_spans(_exc):
+    _spans.current = None
+
+
+# uploads og batch-kald, der profileres ved BC_MEMPROFILE=1 (genereringsjobs profileres i _generate_job)
+MEMPROFILE_ENDPOINTS = ("load_json", "load_docx", "ingest", "generate_batch", "export_portfolio")
+# de her parser/bygger i batch-puljens processer – vinduet ser kun hovedprocessens del
+MEMPROFILE_OUT_OF_PROCESS = ("ingest", "generate_batch")
+
+
+@app.before_request
+def start_memory_window():
+    if memory_profiler.enabled and request.endpoint in MEMPROFILE_ENDPOINTS:
+        g.memory_window = ExitStack()
+        g.memory_window.enter_context(memory_profiler.window(
+            request.endpoint, out_of_process=request.endpoint in MEMPROFILE_OUT_OF_PROCESS, path=request.path))
+
+
+@app.teardown_request
+def stop_memory_window(_exc):
+    window = g.pop("memory_window", None)
+    if window is not None:
+        window.close()
+
+# ---------- statiske filer og HTTP-caching ----------
+# Bootstrap ligger lokalt i static/vendor, så siderne virker uden net
+BOOTSTRAP_CSS = "vendor/bootstrap-5.3.8.min.css"
+STATIC_MAX_AGE = 365 * 24 * 3600
+OUTPUT_MAX_AGE = 24 * 3600
+
+
+@lru_cache(maxsize=None)
+def static_version(filename: str) -> str:
+    """kort hash af filens indhold – ændres filen, ændres URL'en"""
+    try:
+        with open(os.path.join(app.static_folder, filename), "rb") as fh:
+            return hashlib.sha256(fh.read()).hexdigest()[:10]
+    except OSError:
+        return ""
+
+
+def static_url(filename: str) -> str:
+    v = static_version(filename)
+    return url_for("static", filename=filename, v=v) if v else url_for("static", filename=filename)
+
+
+app.jinja_env.globals.update(static_url=static_url, BOOTSTRAP_CSS=BOOTSTRAP_CSS)
+
+# skabelonerne kompileres én gang ved opstart – ikke pr. request
+FORM_TEMPLATE = app.jinja_env.from_string(FORM_HTML)
+RESULT_TEMPLATE = app.jinja_env.from_string(RESULT_HTML)
+CASES_TEMPLATE = app.jinja_env.from_string(CASES_HTML)
+
+
+@lru_cache(maxsize=None)
+def static_logos() -> tuple:
+    """(png, ico) findes i static/ – slås op én gang (main kopierer logoerne ind før start)"""
+    return (
+        os.path.exists(os.path.join("static", "kisbye_logo.png")),
+        os.path.exists(os.path.join("static", "kisbye_logo.ico")),
+    )
+
+
+def render_form(f: dict) -> str:
+    logo_png, logo_ico = static_logos()
+    return render_template(
+        FORM_TEMPLATE,
         title=APP_TITLE,
-        logo_png=os.path.exists(os.path.join("static", "kisbye_logo.png")),
-        logo_ico=os.path.exists(os.path.join("static", "kisbye_logo.ico")),
-        f=empty_form(),
+        logo_png=logo_png,
+        logo_ico=logo_ico,
+        uncertain_fields=UNCERTAIN_FIELDS,
+        case_index=case_index is not None,
+        f=f,
     )
 
 
+@lru_cache(maxsize=1)
+def index_page() -> bytes:
+    """den tomme formular ændrer sig ikke – renderes én gang og genbruges"""
+    return render_form(empty_form()).encode("utf-8")
+
+
+@app.after_request
+def cache_headers(resp):
+    """
+    no-store kun på de dynamiske sider.
+    static/ med ?v=<hash> er uforanderlig; færdige filer i output/ og spørgeskemaet
+    har ETag/Last-Modified, så browseren får 304 i stedet for hele filen igen.
+    """
+    endpoint = request.endpoint
+    if endpoint == "static":
+        if request.args.get("v"):
+            resp.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}, immutable"
+        else:
+            resp.headers["Cache-Control"] = "public, no-cache"
+    elif endpoint == "download_file":
+        resp.headers["Cache-Control"] = f"private, max-age={OUTPUT_MAX_AGE}"
+    elif endpoint == "download_word_template":
+        resp.headers["Cache-Control"] = "public, no-cache"
+    else:
+        resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+        resp.headers["Pragma"] = "no-cache"
+    return resp
+
+
+@app.route("/", methods=["GET"])
+def index():
+    return Response(index_page(), mimetype="text/html")
+
+
 @app.route("/download_word_template", methods=["GET"])
 def download_word_template():
-    content = build_word_questionnaire()
-    return Response(
+    content, etag = questionnaire_docx()
+    resp = Response(
         content,
         mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
         headers={"Content-Disposition": "attachment; filename=businesscase_spoergeskema.docx"},
     )
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
 
 
 @app.route("/load_json", methods=["POST"])
 def load_json():
-    global last_ping
-    last_ping = time.time()
 
     f = empty_form()
     file = request.files.get("jsonfile")
     if not file:
-        return render_template_string(
-            FORM_HTML,
-            title=APP_TITLE,
-            logo_png=os.path.exists(os.path.join("static", "kisbye_logo.png")),
-            logo_ico=os.path.exists(os.path.join("static", "kisbye_logo.ico")),
-            f=f,
-        )
+        return render_form(f)
+    raw_path = None
     try:
-        data = json.loads(file.read().decode("utf-8"))
+        with span("store"):
+            raw_path = store_raw_payload(file.stream)
+        with span("parse"), open(raw_path, "rb") as fp:
+            data = extract_json_sections(fp)
     except Exception as e:
+        if raw_path and os.path.exists(raw_path):
+            os.remove(raw_path)
         f["extra_json"] = f"Kunne ikke læse JSON: {e}"
-        return render_template_string(
-            FORM_HTML,
-            title=APP_TITLE,
-            logo_png=os.path.exists(os.path.join("static", "kisbye_logo.png")),
-            logo_ico=os.path.exists(os.path.join("static", "kisbye_logo.ico")),
-            f=f,
-        )
-
-    for key in f.keys():
-        if key in data and not isinstance(data[key], dict):
-            f[key] = str(data[key])
+        return render_form(f)
 
-    po = data.get("process_overview") or {}
-    if po:
-        f["procesnavn"] = po.get("process_name", f["procesnavn"])
-        f["formaal"] = po.get("objective", f["formaal"])
-        systems = po.get("systems_in_scope")
-        if isinstance(systems, list):
-            f["systemer"] = ", ".join(systems)
-        elif isinstance(systems, str):
-            f["systemer"] = systems
+    f = form_from_json(data, raw_ref="/output/" + os.path.relpath(raw_path, OUTPUT_DIR).replace(os.sep, "/"))
 
-    ta = data.get("timing_analysis") or {}
-    if ta:
-        if "minutes_per_hire" in ta:
-            f["varighed_min"] = str(ta["minutes_per_hire"])
-        workdays = po.get("workdays_per_year") or ta.get("workdays_per_year")
-        if workdays:
-            f["arbejdsdage_pr_aar"] = str(workdays)
-        freq = ta.get("frequency_per_week")
-        if freq:
-            f["frekvens_pr_uge"] = str(freq)
+    with span("render"):
+        return render_form(f)
 
-    f["extra_json"] = json.dumps(data, indent=2, ensure_ascii=False)
 
-    return render_template_string(
-        FORM_HTML,
-        title=APP_TITLE,
-        logo_png=os.path.exists(os.path.join("static", "kisbye_logo.png")),
-        logo_ico=os.path.exists(os.path.join("static", "kisbye_logo.ico")),
-        f=f,
-    )
+@app.errorhandler(413)
+def upload_too_large(_e):
+    msg = f"Filen er for stor (max {MAX_UPLOAD_MB} MB – sæt BC_MAX_UPLOAD_MB for at ændre grænsen)."
+    if request.path in ("/load_json", "/load_docx"):
+        f = empty_form()
+        f["extra_json"] = msg
+        return render_form(f), 413
+    return jsonify({"error": msg}), 413
 
 
 @app.route("/load_docx", methods=["POST"])
 def load_docx():
-    global last_ping
-    last_ping = time.time()
 
     file = request.files.get("docxfile")
     if not file:
         f = empty_form()
         f["extra_json"] = "Ingen Word-fil valgt."
-        return render_template_string(
-            FORM_HTML,
-            title=APP_TITLE,
-            logo_png=os.path.exists(os.path.join("static", "kisbye_logo.png")),
-            logo_ico=os.path.exists(os.path.join("static", "kisbye_logo.ico")),
-            f=f,
-        )
+        return render_form(f)
 
     try:
-        filled = parse_docx_to_form(file)
+        with span("parse"):
+            filled = parse_docx_to_form(file)
     except Exception:
         filled = None
 
@@ -939,108 +3771,401 @@ def load_docx():
         filled = empty_form()
         filled["extra_json"] = "Kunne ikke læse Word-filen – tjek formatet."
 
-    return render_template_string(
-        FORM_HTML,
-        title=APP_TITLE,
-        logo_png=os.path.exists(os.path.join("static", "kisbye_logo.png")),
-        logo_ico=os.path.exists(os.path.join("static", "kisbye_logo.ico")),
-        f=filled,
-    )
+    with span("render"):
+        return render_form(filled)
 
 
 @app.route("/generate", methods=["POST"])
 def generate():
-    global last_ping
-    last_ping = time.time()
 
-    c = empty_form()
-    for key in c.keys():
-        if key in request.form:
-            c[key] = request.form.get(key, "").strip()
+    with span("normalize"):
+        c = normalize_form(request.form, number_inputs=True)
+
+    in_memory = request.form.get("levering_zip") == "1"
+    keep_copy = in_memory and request.form.get("gem_kopi") == "1"
+
+    outdir = OUTPUT_DIR if in_memory and not keep_copy else ensure_output_dir()
+    with span("submit"):
+        job_id = submit_generate_job(c, outdir, in_memory=in_memory, keep_copy=keep_copy)
+    wants_json = request.accept_mimetypes.best == "application/json"
+    if job_id is None:
+        if activity.stopping:
+            msg = "Programmet er ved at lukke ned – start det igen for at generere."
+        else:
+            msg = "Der er for mange genereringer i kø – prøv igen om lidt."
+        if wants_json:
+            return jsonify({"error": msg}), 503
+        return Response(msg, status=503, mimetype="text/plain")
+
+    if wants_json:
+        return jsonify({"job_id": job_id, "status_url": url_for("job_status", job_id=job_id)}), 202
+    return render_template(
+        RESULT_TEMPLATE, outdir=outdir, job_id=job_id, in_memory=in_memory, keep_copy=keep_copy,
+    )
 
-    m = calc_metrics(c)
 
-    outdir = ensure_output_dir()
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify({"cases": artifact_cache.stats(), "artifacts": artifact_piece_cache.stats()})
+
+
+@app.route("/export_portfolio", methods=["POST"])
+def export_portfolio():
+    """samme input som /generate_batch – men ét samlet Excel-ark i stedet for tre filer pr. case"""
+
+    try:
+        forms = _read_batch_payload()
+    except Exception as e:
+        return jsonify({"error": f"Kunne ikke læse portefølje: {e}"}), 400
+    if forms is None:
+        return jsonify({"error": "Forventede et JSON-array af formularer (eller {\"cases\": [...]})."}), 400
+
+    cases = [normalize_form(f) for f in forms]
     stamp = datetime.now().strftime("%Y%m%d_%H%M")
-    base = safe_name(c.get("procesnavn") or "RPA_BusinessCase")
+    path = reserve_path(ensure_output_dir(), f"Portefoelje_{stamp}.xlsx")
+    try:
+        stats = build_portfolio_excel(path, cases)
+    except Exception:
+        # ingen halve/tomme filer i output-mappen
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    print(f"[portefølje] {stats['rows']} rækker på {stats['seconds']} s, RSS +{stats['peak_rss_delta_mb']} MB")
+    stats["url"] = f"/output/{os.path.basename(path)}"
+    return jsonify(stats)
+
+
+def add_output_urls(manifest: dict) -> dict:
+    """batch-manifest: filstier -> download-links"""
+    for case in manifest["cases"]:
+        files = case.get("files") or {}
+        case["urls"] = {k: f"/output/{os.path.basename(v)}" for k, v in files.items()}
+    return manifest
 
-    excel_path = os.path.join(outdir, f"{base}_BC_{stamp}.xlsx")
-    pdd_path = os.path.join(outdir, f"{base}_PDD_RTS_{stamp}.docx")
-    lb_path = os.path.join(outdir, f"{base}_Ledelsesbeskrivelse_{stamp}.docx")
 
-    build_excel(excel_path, c, m)
-    build_word_pdd(pdd_path, c, m)
-    build_word_leadership(lb_path, c, m, extra_json_text=c.get("extra_json", ""))
+@app.route("/ingest", methods=["POST"])
+def ingest():
+    """
+    Mange spørgeskemaer på én gang: filer i feltet 'files' (.docx, .json eller .zip).
+    ?generate=1 sender de indlæste cases direkte videre til batch-generering.
+    """
 
-    return render_template_string(
-        RESULT_HTML,
-        outdir=outdir,
-        excel_url=f"/output/{os.path.basename(excel_path)}",
-        pdd_url=f"/output/{os.path.basename(pdd_path)}",
-        lb_url=f"/output/{os.path.basename(lb_path)}",
+    uploads = [(f.filename or "upload", f.read()) for f in request.files.getlist("files") if f]
+    if not uploads:
+        return jsonify({"error": "Ingen filer modtaget (brug feltet 'files')."}), 400
+
+    try:
+        result = ingest_files(uploads)
+    except UploadRejected as e:
+        return jsonify({"error": str(e)}), 413
+    if request.args.get("generate") == "1" and result["cases"]:
+        result["batch"] = add_output_urls(run_batch([case["form"] for case in result["cases"]]))
+    return jsonify(json_safe(result))
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Ukendt eller udløbet job."}), 404
+    if job["status"] == "done":
+        g.job_spans = job.get("spans")
+    return jsonify(job_view(job))
+
+
+@app.route("/jobs/<job_id>/download.zip", methods=["GET"])
+def job_download_zip(job_id):
+    """alle filer fra et job bygget i hukommelsen – streames som én ZIP"""
+
+    job = jobs.get(job_id)
+    result = (job or {}).get("result") or {}
+    buffers = result.get("buffers")
+    if not buffers:
+        return jsonify({"error": "Ingen ZIP til dette job (ukendt, udløbet eller ikke bygget i hukommelsen)."}), 404
+
+    names = result["names"]
+    entries = [(names[k], buf) for k, buf in buffers.items()]
+    zip_name = os.path.splitext(names["excel"])[0].replace("_BC_", "_") + ".zip"
+    return Response(
+        stream_zip(entries),
+        mimetype="application/zip",
+        headers={"Content-Disposition": content_disposition(zip_name)},
     )
 
 
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Server-Sent Events: én besked pr. fremskridt, stopper når jobbet er færdigt"""
+    def stream():
+        version = -1
+        while True:
+            job = jobs.wait(job_id, version, timeout=15)
+            if job is None:
+                # almindelig besked (ikke 'event: error'), så siden viser fejlen og lukker streamen
+                gone = {"id": job_id, "status": "failed", "step": "Ukendt job", "progress": 0,
+                        "error": "Ukendt eller udløbet job."}
+                yield f"data: {json.dumps(gone, ensure_ascii=False)}\n\n"
+                return
+            if job["version"] == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = job["version"]
+            yield f"data: {json.dumps(job_view(job), ensure_ascii=False)}\n\n"
+            if job["status"] in ("done", "failed"):
+                return
+
+    return Response(stream(), mimetype="text/event-stream", headers={"X-Accel-Buffering": "no"})
+
+
+def _read_batch_payload():
+    """henter listen af formularer fra JSON-body eller uploadet fil (JSON-array eller én JSON pr. linje)"""
+    data = request.get_json(silent=True)
+    if data is None:
+        file = request.files.get("batchfile")
+        if not file:
+            return None
+        raw = file.read().decode("utf-8-sig")
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            data = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get("cases")
+    if not isinstance(data, list) or not all(isinstance(x, dict) for x in data):
+        return None
+    return data
+
+
+@app.route("/generate_batch", methods=["POST"])
+def generate_batch():
+
+    try:
+        forms = _read_batch_payload()
+    except Exception as e:
+        return jsonify({"error": f"Kunne ikke læse batch: {e}"}), 400
+    if forms is None:
+        return jsonify({"error": "Forventede et JSON-array af formularer (eller {\"cases\": [...]})."}), 400
+
+    backend = request.args.get("backend") or DOCX_BACKEND
+    if backend not in ("docx", "ooxml"):
+        return jsonify({"error": f"Ukendt backend: {backend}"}), 400
+    return jsonify(json_safe(add_output_urls(run_batch(forms, docx_backend=backend))))
+
+
 @app.route("/output/<path:filename>")
 def download_file(filename):
     return send_from_directory(OUTPUT_DIR, filename, as_attachment=True)
 
 
+@app.after_request
+def mark_first_response(resp):
+    if "first_response" not in STARTUP_TIMELINE:
+        mark_startup("first_response")
+        print("[startup] " + " · ".join(f"{k} {v:.2f}s" for k, v in STARTUP_TIMELINE.items()))
+    return resp
+
+
+@app.route("/cases", methods=["GET"])
+def cases():
+    """søg i tidligere genererede cases (kun SQLite – output-mappen røres ikke); ?format=json giver JSON"""
+    if case_index is None:
+        return jsonify({"error": "Case-indekset er slået fra (BC_CASE_DB)."}), 404
+
+    args = {
+        "q": request.args.get("q", "").strip(),
+        "owner": request.args.get("owner", "").strip(),
+        "min_savings": request.args.get("min_savings", "").strip(),
+        "date_from": request.args.get("from", "").strip(),
+        "date_to": request.args.get("to", "").strip(),
+        "sort": request.args.get("sort", "nyeste"),
+    }
+    page = max(1, request.args.get("page", 1, type=int))
+    min_savings = to_number(args["min_savings"], None) if args["min_savings"] else None
+    # datoer sammenlignes som tekst i SQLite – kun gyldige datoer bruges (skrevet som ÅÅÅÅ-MM-DD), resten ignoreres
+    for key in ("date_from", "date_to"):
+        try:
+            args[key] = datetime.strptime(args[key], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            args[key] = ""
+
+    t0 = time.perf_counter()
+    with span("search"):
+        rows, total = case_index.search(
+            q=args["q"], owner=args["owner"], min_savings=min_savings,
+            date_from=args["date_from"], date_to=args["date_to"], sort=args["sort"],
+            limit=CASES_PAGE_SIZE, offset=(page - 1) * CASES_PAGE_SIZE,
+        )
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    if request.args.get("format") == "json" or request.accept_mimetypes.best == "application/json":
+        return jsonify({"total": total, "page": page, "page_size": CASES_PAGE_SIZE, "cases": rows})
+
+    def page_url(n):
+        return url_for("cases", **dict(request.args, page=n))
+
+    return render_template(
+        CASES_TEMPLATE, cases=rows, total=total, page=page, page_size=CASES_PAGE_SIZE, args=args,
+        owners=case_index.owners(), sorts=CASE_SORTS, elapsed_ms=elapsed_ms, page_url=page_url,
+        fmt_dkk=fmt_dkk, fmt_num=fmt_num,
+    )
+
+
+@app.route("/cases/<int:case_id>", methods=["GET"])
+def case_detail(case_id):
+    """åbn en tidligere case i formularen (kan rettes og genereres igen); ?format=json giver hele rækken"""
+    case = case_index.get(case_id) if case_index is not None else None
+    if case is None:
+        return jsonify({"error": "Ukendt case."}), 404
+    if request.args.get("format") == "json":
+        return jsonify(case)
+    return render_form(dict(empty_form(), **case["form"]))
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus-tekstformat: request- og fase-histogrammer + et par gauges"""
+    gauges = (
+        "# HELP bc_in_flight Igangværende requests og jobs\n# TYPE bc_in_flight gauge\n"
+        f"bc_in_flight {max(0, activity.busy() - 1)}\n"
+        "# HELP bc_jobs_pending Genereringer i kø eller i gang\n# TYPE bc_jobs_pending gauge\n"
+        f"bc_jobs_pending {jobs.pending()}\n"
+    )
+    if tracemalloc.is_tracing():
+        gauges += (
+            "# HELP bc_memory_traced_bytes Hukommelse fulgt af tracemalloc (BC_MEMPROFILE=1)\n"
+            f"# TYPE bc_memory_traced_bytes gauge\nbc_memory_traced_bytes {tracemalloc.get_traced_memory()[0]}\n"
+        )
+    return Response(metrics.render() + gauges, mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/diagnostics/memory", methods=["GET"])
+def memory_diagnostics():
+    """profileringsdata ved BC_MEMPROFILE=1: seneste vinduer, markerede og vækst siden start (?top=N)"""
+    top = request.args.get("top", type=int)
+    return jsonify(memory_profiler.report(top=top))
+
+
+@app.route("/startup", methods=["GET"])
+def startup_timeline():
+    # i faserækkefølge (jsonify sorterer nøglerne)
+    return Response(json.dumps(STARTUP_TIMELINE), mimetype="application/json")
+
+
 @app.route("/shutdown", methods=["POST"])
 def shutdown():
-    def delayed():
-        time.sleep(0.3)
-        os._exit(0)
-    threading.Thread(target=delayed, daemon=True).start()
-    return jsonify({"status": "ok"})
+    if SERVER_MODE == "production":
+        return jsonify({"error": "Serveren kan ikke lukkes udefra i servertilstand."}), 403
+
+    # svaret her tæller selv som igangværende – graceful_exit venter også på det
+    threading.Thread(target=graceful_exit, args=("/shutdown",), daemon=True).start()
+    return jsonify({"status": "ok", "in_flight": activity.busy() - 1})
 
 
 # ============================================================
 # AFSNIT 10 – MAIN
 # ============================================================
-def idle_killer(seconds=180):
-    global last_ping
-    while True:
-        time.sleep(10)
-        try:
-            if time.time() - last_ping > seconds:
-                print("[idle-killer] Ingen aktivitet – lukker ned.")
-                os._exit(0)
-        except Exception:
-            pass
+def copy_if_changed(src: str, dst: str):
+    """kopiér kun hvis dst mangler eller er anderledes (størrelse/tid) – sparer tid ved hver opstart"""
+    if not os.path.exists(src) or os.path.abspath(src) == os.path.abspath(dst):
+        return
+    try:
+        a = os.stat(src)
+        b = os.stat(dst) if os.path.exists(dst) else None
+        if b is None or a.st_size != b.st_size or a.st_mtime > b.st_mtime:
+            shutil.copy2(src, dst)
+    except Exception:
+        pass
+
+
+def warm_up_after_start():
+    warm_up()
+    mark_startup("warm")
 
 
-def open_browser():
+def graceful_exit(reason: str, timeout: float = None):
+    """tag ikke imod nye jobs, vent på igangværende requests/jobs, luk worker-processerne og afslut"""
+    timeout = DRAIN_TIMEOUT_SECONDS if timeout is None else timeout
+    print(f"[lukning] {reason} – venter på {activity.busy()} igangværende (max {timeout} s)")
+    if not activity.drain(timeout):
+        print(f"[lukning] {activity.busy()} stadig i gang efter {timeout} s – lukker alligevel")
+    with _batch_pool_lock:
+        if _batch_pool is not None:
+            _batch_pool.shutdown(wait=False, cancel_futures=True)
+    os._exit(0)
+
+
+def idle_killer(seconds: float = None):
+    """venter (uden polling) til der ikke har været aktivitet i 'seconds' og intet er i gang"""
+    seconds = IDLE_TIMEOUT_SECONDS if seconds is None else seconds
+    activity.wait_idle(seconds)
+    graceful_exit("ingen aktivitet")
+
+
+def open_browser(url: str = "http://127.0.0.1:5000"):
+    """kaldes først når serveren lytter – så der er ikke noget at vente på"""
     try:
-        time.sleep(0.7)
-        webbrowser.open("http://127.0.0.1:5000", new=2)
+        webbrowser.open(url, new=2)
     except Exception as e:
         print("[open_browser] Kunne ikke åbne browser:", e)
 
 
+def serve_production(host: str, port: int, threads: int):
+    """waitress med en fast pulje af tråde; uden waitress: werkzeugs flertrådede server"""
+    try:
+        from waitress.server import create_server
+    except ImportError:
+        print("[server] waitress er ikke installeret (pip install waitress) – bruger werkzeugs server")
+        from werkzeug.serving import make_server
+        server = make_server(host, port, app, threaded=True)
+        run = server.serve_forever
+    else:
+        server = create_server(app, host=host, port=port, threads=threads)
+        run = server.run
+    mark_startup("listening")
+    threading.Thread(target=warm_up_after_start, daemon=True).start()
+    print(f"Kører i servertilstand på http://{host}:{port} ({threads} tråde)")
+    run()
+
+
+mark_startup("import")
+
 if __name__ == "__main__":
+    # nødvendig for ProcessPoolExecutor i PyInstaller .exe
+    multiprocessing.freeze_support()
+
     # sørg for static-mappe
     os.makedirs(os.path.join(script_dir, "static"), exist_ok=True)
 
     # kopier logo hvis det ligger ved siden af
-    src_png = os.path.join(script_dir, LOGO_PNG_SOURCE)
-    dst_png = os.path.join(script_dir, "static", "kisbye_logo.png")
-    if os.path.exists(src_png) and os.path.abspath(src_png) != os.path.abspath(dst_png):
-        try:
-            shutil.copy(src_png, dst_png)
-        except Exception:
-            pass
-
-    src_ico = os.path.join(script_dir, LOGO_ICO_SOURCE)
-    dst_ico = os.path.join(script_dir, "static", "kisbye_logo.ico")
-    if os.path.exists(src_ico) and os.path.abspath(src_ico) != os.path.abspath(dst_ico):
-        try:
-            shutil.copy(src_ico, dst_ico)
-        except Exception:
-            pass
-
-    threading.Thread(target=idle_killer, args=(180,), daemon=True).start()
-    threading.Thread(target=open_browser, daemon=True).start()
-
-    print("Kører på http://127.0.0.1:5000")
-    app.run(host="127.0.0.1", port=5000, debug=False)
+    copy_if_changed(os.path.join(script_dir, LOGO_PNG_SOURCE), os.path.join(script_dir, "static", "kisbye_logo.png"))
+    copy_if_changed(os.path.join(script_dir, LOGO_ICO_SOURCE), os.path.join(script_dir, "static", "kisbye_logo.ico"))
+    mark_startup("static_copy")
+
+    # SIGTERM (fx fra systemd/Task Scheduler) lukker pænt ned i stedet for midt i en generering
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=graceful_exit, args=("SIGTERM",)).start())
+
+    if MEMPROFILE_ENABLED:
+        memory_profiler.start()
+        print(f"Hukommelsesprofilering slået til (grænse {MEMPROFILE_THRESHOLD_MB:g} MB) – se /diagnostics/memory")
+
+    if SERVER_MODE == "production":
+        serve_production(SERVER_HOST, SERVER_PORT, SERVER_THREADS)
+        sys.exit(0)
+
+    # bind selv, så browseren kan åbnes i samme øjeblik serveren lytter
+    from werkzeug.serving import make_server
+    server = make_server(SERVER_HOST, SERVER_PORT, app, threaded=True)
+    mark_startup("listening")
+
+    if IDLE_TIMEOUT_SECONDS > 0:
+        threading.Thread(target=idle_killer, daemon=True).start()
+    url = f"http://{SERVER_HOST}:{SERVER_PORT}"
+    threading.Thread(target=open_browser, args=(url,), daemon=True).start()
+    # dokument-bibliotekerne importeres i baggrunden, mens brugeren kigger på formularen
+    threading.Thread(target=warm_up_after_start, daemon=True).start()
+
+    print(f"Kører på {url}")
+    server.serve_forever()
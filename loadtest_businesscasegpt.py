@@ -0,0 +1,354 @@
+# ============================================================
+#  Kisbye Consulting – BusinessCaseGPT – belastningstest
+#
+#  Sender en blanding af requests (forside, JSON-/Word-indlæsning,
+#  generering, download) fra mange samtidige "brugere" og måler
+#  throughput, p50/p95/p99-svartider, fejlrate og væksten i output/.
+#
+#  Kør:
+#    python loadtest_businesscasegpt.py                                  (in-process, Flask test client,
+#                                                                         output og case-indeks i en temp-mappe)
+#    python loadtest_businesscasegpt.py --scenario loadtest_scenario.json
+#    python loadtest_businesscasegpt.py --url http://127.0.0.1:5000      (mod en kørende server)
+# ============================================================
+
+import os
+import sys
+import io
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# bruges når der ikke angives en scenariefil
+DEFAULT_SCENARIO = {
+    "concurrency": 8,
+    "duration_s": 20,
+    "case_size": "small",
+    "unique_forms": True,
+    "job_timeout_s": 120,
+    "mix": [
+        {"action": "index", "weight": 10},
+        {"action": "load_json", "weight": 2},
+        {"action": "load_docx", "weight": 2},
+        {"action": "generate", "weight": 3},
+        {"action": "download", "weight": 3},
+    ],
+}
+
+ACTIONS = ("index", "load_json", "load_docx", "generate", "download")
+# afledte målinger (ikke selvstændige requests) – tæller med i fejlraten, ikke i throughput
+DERIVED = ("generate_done",)
+
+
+# ============================================================
+# TRANSPORT – Flask test client eller rigtig socket
+# ============================================================
+def _multipart(files: dict) -> tuple:
+    """{felt: (filnavn, bytes)} -> (body, content-type)"""
+    boundary = uuid.uuid4().hex
+    out = io.BytesIO()
+    for field, (filename, data) in files.items():
+        out.write(f"--{boundary}\r\n".encode())
+        out.write(f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'.encode())
+        out.write(b"Content-Type: application/octet-stream\r\n\r\n")
+        out.write(data)
+        out.write(b"\r\n")
+    out.write(f"--{boundary}--\r\n".encode())
+    return out.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+class TestClientTransport:
+    """
+    in-process – ingen netværk, måler appen alene.
+    output/ og case-indekset peges ind i workdir via BC_OUTPUT_DIR/BC_CASE_DB, så testen ikke fylder
+    den rigtige output-mappe eller databasen. Derfor skal appen importeres her og ikke før.
+    """
+
+    def __init__(self, workdir: str):
+        if "businesscasegpt_v9_0_web" in sys.modules:
+            raise RuntimeError("appen er allerede importeret – in-process-testen ville skrive i den rigtige output/")
+        os.environ["BC_OUTPUT_DIR"] = os.path.join(workdir, "output")
+        os.environ["BC_CASE_DB"] = os.path.join(workdir, "businesscase_cases.sqlite3")
+        import businesscasegpt_v9_0_web as bc
+        self.app = bc.app
+        self.output_dir = bc.OUTPUT_DIR
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def request(self, method: str, path: str, form: dict = None, files: dict = None, headers: dict = None):
+        data = dict(form or {})
+        for field, (filename, raw) in (files or {}).items():
+            data[field] = (io.BytesIO(raw), filename)
+        with self._client().open(path, method=method, data=data or None, headers=headers or {}) as resp:
+            return resp.status_code, resp.get_data()
+
+
+class HttpTransport:
+    """mod en kørende server (fx BC_SERVER=production) – én keep-alive-forbindelse pr. tråd"""
+
+    def __init__(self, url: str, output_dir: str):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.output_dir = output_dir
+        self._local = threading.local()
+
+    def _conn(self, fresh: bool = False):
+        if fresh or not hasattr(self._local, "conn"):
+            self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        return self._local.conn
+
+    def request(self, method: str, path: str, form: dict = None, files: dict = None, headers: dict = None):
+        headers = dict(headers or {})
+        body = None
+        if files:
+            body, headers["Content-Type"] = _multipart(files)
+        elif form:
+            from urllib.parse import urlencode
+            body = urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for attempt in (0, 1):
+            conn = self._conn(fresh=attempt == 1)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.HTTPException, ConnectionError):
+                if attempt:
+                    raise
+
+
+# ============================================================
+# HANDLINGER
+# ============================================================
+class LoadTest:
+    def __init__(self, transport, scenario: dict, seed: int = 1):
+        from bench_businesscasegpt import synthetic_case, filled_questionnaire
+        self.t = transport
+        self.scenario = scenario
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.samples = {}  # navn -> [(sekunder, ok)]
+        self.downloads = []  # /output/... fra færdige genereringer
+        base = synthetic_case(scenario.get("case_size", "small"))
+        self.base_case = {k: v for k, v in base.items() if k != "extra_json"}
+        self.json_payload = json.dumps(dict(self.base_case, process_overview={"process_name": "Belastningstest"}),
+                                       ensure_ascii=False).encode("utf-8")
+        self.docx_payload = filled_questionnaire(base)
+
+    def record(self, name: str, seconds: float, ok: bool):
+        with self.lock:
+            self.samples.setdefault(name, []).append((seconds, ok))
+
+    def timed(self, name: str, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            status, body = self.t.request(*args, **kwargs)
+        except Exception:
+            self.record(name, time.perf_counter() - t0, False)
+            return None, b""
+        self.record(name, time.perf_counter() - t0, status < 400)
+        return status, body
+
+    def form(self) -> dict:
+        c = dict(self.base_case)
+        if self.scenario.get("unique_forms", True):
+            c["procesnavn"] = f"Load {uuid.uuid4().hex[:8]}"
+        return c
+
+    def index(self):
+        self.timed("index", "GET", "/")
+
+    def load_json(self):
+        self.timed("load_json", "POST", "/load_json", files={"jsonfile": ("case.json", self.json_payload)})
+
+    def load_docx(self):
+        self.timed("load_docx", "POST", "/load_docx", files={"docxfile": ("case.docx", self.docx_payload)})
+
+    def generate(self):
+        """
+        POST /generate + polling til jobbet er færdigt; 'generate_done' er hele ventetiden.
+        Et job, der ikke er færdigt efter job_timeout_s, tæller som fejl (så en hængende server ikke låser tråden).
+        """
+        t0 = time.perf_counter()
+        status, body = self.timed("generate", "POST", "/generate", form=self.form(),
+                                  headers={"Accept": "application/json"})
+        if status != 202:
+            self.record("generate_done", time.perf_counter() - t0, False)
+            return
+        job_id = json.loads(body)["job_id"]
+        deadline = t0 + float(self.scenario.get("job_timeout_s", 120))
+        while True:
+            try:
+                status, body = self.t.request("GET", f"/jobs/{job_id}")
+                job = json.loads(body) if status == 200 else {"status": "failed"}
+            except Exception:
+                job = {"status": "failed"}
+            if job["status"] in ("done", "failed"):
+                break
+            if time.perf_counter() > deadline:
+                job = {"status": "timeout"}
+                break
+            time.sleep(0.05)
+        self.record("generate_done", time.perf_counter() - t0, job["status"] == "done")
+        if job.get("urls"):
+            with self.lock:
+                self.downloads.extend(job["urls"].values())
+                del self.downloads[:-200]
+
+    def download(self):
+        with self.lock:
+            url = self.rng.choice(self.downloads) if self.downloads else None
+        if url is None:
+            self.generate()
+            return
+        self.timed("download", "GET", url)
+
+    # ---------- kørsel ----------
+    def pick(self, rng: random.Random) -> str:
+        mix = self.scenario["mix"]
+        return rng.choices([m["action"] for m in mix], weights=[m.get("weight", 1) for m in mix])[0]
+
+    def worker(self, index: int, deadline: float, budget: list):
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            if budget is not None:
+                with self.lock:
+                    if budget[0] <= 0:
+                        return
+                    budget[0] -= 1
+            getattr(self, self.pick(rng))()
+
+    def run(self) -> dict:
+        sc = self.scenario
+        concurrency = int(sc.get("concurrency", 8))
+        total = sc.get("requests")
+        budget = [int(total)] if total else None
+        duration = float(sc.get("duration_s", 20)) if not total else float("inf")
+
+        before = dir_size(self.t.output_dir)
+        t0 = time.perf_counter()
+        deadline = t0 + duration
+        threads = [threading.Thread(target=self.worker, args=(i, deadline, budget)) for i in range(concurrency)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        elapsed = time.perf_counter() - t0
+        after = dir_size(self.t.output_dir)
+        return report(self.samples, elapsed, concurrency, before, after)
+
+
+# ============================================================
+# RAPPORT
+# ============================================================
+def dir_size(path: str) -> tuple:
+    """(antal filer, bytes) i mappen inkl. undermapper"""
+    files = size = 0
+    for root, _dirs, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                pass
+    return files, size
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """nearest-rank: den mindste værdi, som mindst pct % af målingerne er mindre end eller lig med"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def report(samples: dict, elapsed: float, concurrency: int, before: tuple, after: tuple) -> dict:
+    rows = {}
+    total = errors = 0
+    for name, values in sorted(samples.items()):
+        times = sorted(s for s, _ok in values)
+        n_err = sum(1 for _s, ok in values if not ok)
+        if name not in DERIVED:
+            total += len(values)
+        errors += n_err
+        rows[name] = {
+            "count": len(values),
+            "errors": n_err,
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(times, 50) * 1000, 1),
+            "p95_ms": round(percentile(times, 95) * 1000, 1),
+            "p99_ms": round(percentile(times, 99) * 1000, 1),
+        }
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "output_growth": {"files": after[0] - before[0], "bytes": after[1] - before[1]},
+        "actions": rows,
+    }
+
+
+def print_report(r: dict):
+    print(f"\n{r['requests']} requests på {r['elapsed_s']} s med {r['concurrency']} samtidige brugere "
+          f"– {r['throughput_rps']} req/s, fejlrate {r['error_rate']:.2%}")
+    print(f"  {'handling':<15}{'antal':>7}{'fejl':>6}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in r["actions"].items():
+        print(f"  {name:<15}{row['count']:>7}{row['errors']:>6}{row['rps']:>8}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+    g = r["output_growth"]
+    print(f"  output/ voksede med {g['files']} filer / {g['bytes'] / 1024 / 1024:.1f} MB")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Belastningstest for BusinessCaseGPT")
+    ap.add_argument("--scenario", default="", help="JSON-fil med concurrency, duration_s/requests, case_size og mix")
+    ap.add_argument("--url", default="", help="kør mod en server på denne adresse i stedet for in-process")
+    ap.add_argument("--output-dir", default=os.path.join(BASE_DIR, "output"),
+                    help="serverens output-mappe (til måling af vækst ved --url)")
+    ap.add_argument("--concurrency", type=int, default=0, help="overskriv scenariets concurrency")
+    ap.add_argument("--duration", type=float, default=0, help="overskriv scenariets duration_s")
+    ap.add_argument("--json", default="", help="skriv rapporten til denne fil")
+    args = ap.parse_args(argv)
+
+    scenario = dict(DEFAULT_SCENARIO)
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as fh:
+            scenario.update(json.load(fh))
+    if args.concurrency:
+        scenario["concurrency"] = args.concurrency
+    if args.duration:
+        scenario["duration_s"] = args.duration
+        scenario.pop("requests", None)
+    unknown = [m["action"] for m in scenario["mix"] if m["action"] not in ACTIONS]
+    if unknown:
+        ap.error(f"ukendt handling i mix: {', '.join(unknown)} (kendte: {', '.join(ACTIONS)})")
+
+    if args.url:
+        result = LoadTest(HttpTransport(args.url, args.output_dir), scenario).run()
+    else:
+        with tempfile.TemporaryDirectory(prefix="bc_loadtest_", ignore_cleanup_errors=True) as workdir:
+            result = LoadTest(TestClientTransport(workdir), scenario).run()
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# testene importerer appen direkte fra repo-roden
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
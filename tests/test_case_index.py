@@ -0,0 +1,29 @@
+import businesscasegpt_v9_0_web as app
+
+
+def _entry(name):
+    c = app.normalize_form({"procesnavn": name, "proces_ejer": "Åse"})
+    return c, app.calc_metrics(c), {}
+
+
+def test_cache_hits_update_the_existing_row(tmp_path):
+    index = app.CaseIndex(str(tmp_path / "cases.sqlite3"))
+    assert index.record_many([_entry("Fakturering")], "generate") == 1
+    assert index.record_many([_entry("Fakturering")], "cached") == 0
+    assert index.record_many([_entry("Fakturering")], "cached") == 0
+
+    rows, total = index.search("fakt")
+    assert total == 1
+    assert rows[0]["source"] == "generate"
+    assert rows[0]["hits"] == 3
+    assert rows[0]["last_seen"] >= rows[0]["created"]
+
+
+def test_cache_hit_without_earlier_row_is_recorded(tmp_path):
+    index = app.CaseIndex(str(tmp_path / "cases.sqlite3"))
+    assert index.record_many([_entry("Løn")], "cached") == 1
+    assert index.record_many([_entry("Løn")], "generate") == 1  # ny kørsel = nye filer = ny række
+
+    rows, total = index.search()
+    assert total == 2
+    assert sorted(r["source"] for r in rows) == ["cached", "generate"]
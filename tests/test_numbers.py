@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import businesscasegpt_v9_0_web as app
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("12", 12.0),
+    ("3,5", 3.5),
+    ("1.234,5", 1234.5),
+    ("1.000", 1000.0),
+    ("12.500", 12500.0),
+    ("450 000", 450000.0),
+    ("2.5", 2.5),
+    ("0.75", 0.75),
+    ("0.125", 0.125),
+    ("1.125", 1125.0),  # tekst med dansk tusindtalspunktum
+    ("-0.125", -0.125),
+    ("", 7.0),
+    (None, 7.0),
+    ("abc", 7.0),
+    (1.125, 1.125),
+])
+def test_to_number(raw, expected):
+    assert app.to_number(raw, 7.0) == expected
+
+
+def test_normalize_form_keeps_json_numbers():
+    c = app.normalize_form({"varighed_min": 1.125, "frekvens_pr_uge": 3, "procesnavn": 42})
+    assert c["varighed_min"] == 1.125
+    assert c["frekvens_pr_uge"] == 3
+    assert c["procesnavn"] == "42"
+    assert app.calc_metrics(c)["minutter_pr_aar"] == 1.125 * 3 * 52
+
+
+def test_normalize_form_number_inputs_are_decimal():
+    # <input type=number> sender "1.125" for 1,125 – aldrig et tusindtal
+    c = app.normalize_form({"varighed_min": "1.125", "investering_kr": "60000", "procesnavn": "1.125"},
+                           number_inputs=True)
+    assert c["varighed_min"] == 1.125
+    assert c["investering_kr"] == 60000
+    assert c["procesnavn"] == "1.125"
+
+
+def test_simulation_without_break_even_is_valid_json():
+    pytest.importorskip("numpy")
+    # drift dyrere end besparelsen: investeringen tjenes aldrig hjem
+    c = app.normalize_form({"varighed_min": 1, "frekvens_pr_uge": 1, "drift_aarlig_kr": 100000})
+    sim = app.simulate_metrics(c, samples=1000)
+    assert sim["break_even_aar"]["p50"] == float("inf")
+    safe = app.json_safe({"simulation": sim, "metrics": app.calc_metrics(c)})
+    json.dumps(safe, allow_nan=False)
+    assert safe["simulation"]["break_even_aar"]["p50"] is None
@@ -0,0 +1,76 @@
+"""
+Golden-tjek af BC_DOCX_BACKEND=ooxml: begge Word-dokumenter for en fast case skal have samme tekst
+som python-docx gav, da ooxml_golden.json blev skrevet.
+Ændres layoutet med vilje: python tests/test_ooxml_golden.py skriver filen igen (med python-docx som reference).
+"""
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import businesscasegpt_v9_0_web as app  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ooxml_golden.json")
+
+
+def golden_form() -> dict:
+    """
+    fast case med det, der er svært at få ens i to writers: æøå, XML-tegn, tabulator og linjeskift.
+    Ingen kontroltegn – dem fjerner OOXML-writeren, mens python-docx fejler.
+    """
+    c = app.empty_form()
+    c.update({
+        "procesnavn": "Løn & <refusion> \"ÆØÅ\"",
+        "formaal": "Indledende afsnit\tmed tabulator",
+        "proces_ejer": "Åse Ørum",
+        "sponsor": "CFO",
+        "systemer": "SAP; Excel & SharePoint",
+        "as_is_beskrivelse": "Trin 1: modtag mail\nTrin 2: tast i SAP\r\nTrin 3: kontrollér > 1.000 kr.",
+        "to_be_beskrivelse": "Robotten læser mailen\n\nog bogfører",
+        "varighed_min_min": "20",
+        "varighed_min_max": "60",
+        "extra_json": json.dumps({"process_overview": {"process_name": "Golden <ø>"}}),
+    })
+    return app.normalize_form(c)
+
+
+def word_text(c: dict, backend: str) -> dict:
+    """teksten i begge Word-dokumenter (app.docx_text) for én backend"""
+    m = app.calc_metrics(c)
+    sim = app.simulate_metrics(c)
+    pdd, ledelse = io.BytesIO(), io.BytesIO()
+    app.build_word_pdd(pdd, c, m, backend=backend)
+    app.build_word_leadership(ledelse, c, m, extra_json_text=c["extra_json"], sim=sim, backend=backend)
+    return {"pdd": app.docx_text(pdd), "ledelse": app.docx_text(ledelse)}
+
+
+def save_golden(path: str = GOLDEN_PATH):
+    c = golden_form()
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"form": c, "text": word_text(c, "docx")}, fh, indent=2, ensure_ascii=False)
+        fh.write("\n")
+
+
+@pytest.fixture(scope="module")
+def golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+@pytest.mark.parametrize("backend", ["docx", "ooxml"])
+def test_word_text_matches_golden(golden, backend):
+    got = word_text(golden["form"], backend)
+    for kind, expected in golden["text"].items():
+        assert got[kind] == expected, (backend, kind)
+
+
+def test_backends_agree_on_default_form():
+    assert app.check_ooxml_backend() == []
+
+
+if __name__ == "__main__":
+    save_golden()
+    print(f"skrev {GOLDEN_PATH}")
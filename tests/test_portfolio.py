@@ -0,0 +1,39 @@
+import pytest
+
+import businesscasegpt_v9_0_web as app
+
+np = pytest.importorskip("numpy")
+
+
+def _assert_same(cases):
+    res = app.calc_metrics_portfolio(cases)
+    for i, case in enumerate(cases):
+        for key, value in app.calc_metrics(case).items():
+            assert res[key][i] == value, (i, key)
+
+
+def test_portfolio_matches_calc_metrics():
+    _assert_same([
+        {"varighed_min": "12", "frekvens_pr_uge": "40", "aarSloen_kr": "450.000"},
+        {"varighed_min": "3,5", "frekvens_pr_uge": "10", "automationsgrad_pct": "60"},
+        {},
+    ])
+
+
+def test_portfolio_mixed_numbers_and_text():
+    # en blandet kolonne må ikke gøre 1.125 til teksten "1.125" (= 1125 i to_number)
+    _assert_same([{"varighed_min": 1.125}, {"varighed_min": "3"}])
+    res = app.calc_metrics_portfolio([
+        {"varighed_min": 1.125, "frekvens_pr_uge": 8},
+        {"varighed_min": "3", "frekvens_pr_uge": "8"},
+    ])
+    assert list(res["minutter_pr_aar"]) == [1.125 * 8 * 52, 3.0 * 8 * 52]
+
+
+def test_portfolio_numeric_columns():
+    cols = {"varighed_min": np.array([1.5, 2.0]), "frekvens_pr_uge": [10, 20]}
+    res = app.calc_metrics_portfolio(cols)
+    assert list(res["fte"]) == [
+        app.calc_metrics({"varighed_min": 1.5, "frekvens_pr_uge": 10})["fte"],
+        app.calc_metrics({"varighed_min": 2.0, "frekvens_pr_uge": 20})["fte"],
+    ]